@@ -0,0 +1,34 @@
+import hmac
+from typing import Any, Dict, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
+from app.core.config import settings
+from app.core.runtime_config import RuntimeConfig
+
+class AdminRouter:
+    def __init__(self, runtime_config: RuntimeConfig):
+        self.runtime_config = runtime_config
+        self.router = APIRouter(prefix="/admin", tags=["admin"], dependencies=[Depends(self.verify_token)])
+        self.setup_routes()
+
+    @staticmethod
+    async def verify_token(x_admin_token: Optional[str] = Header(None)):
+        if not settings.ADMIN_TOKEN:
+            raise HTTPException(status_code=404, detail="Admin API is disabled")
+        if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+            raise HTTPException(status_code=401, detail="Invalid admin token")
+
+    def setup_routes(self):
+        @self.router.get("/config")
+        async def get_config():
+            return self.runtime_config.snapshot()
+
+        @self.router.patch("/config")
+        async def update_config(changes: Dict[str, Any]):
+            try:
+                changed = self.runtime_config.update(changes, source="admin API")
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return {
+                "version": self.runtime_config.version,
+                "changed": changed
+            }
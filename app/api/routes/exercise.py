@@ -1,6 +1,8 @@
-from fastapi import APIRouter, HTTPException, Depends
-from pydantic import BaseModel
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request
+from pydantic import BaseModel, ValidationError
+from typing import Optional, Tuple
+from app.api.uploads import iter_multipart
+from app.core.config import settings
 from app.services.vision import VisionService
 import base64
 import logging
@@ -23,34 +25,52 @@ class ExerciseRouter:
             methods=["POST"],
             response_model=dict,
             summary="Analyze exercise form from image",
-            description="Analyzes exercise form from a base64 encoded image and returns feedback"
+            description=(
+                "Analyzes exercise form from an image and returns feedback. The image can be sent "
+                "as a raw `image/*` body, as the `image` field of a multipart form, or base64 "
+                "encoded in a JSON body. For raw bodies, pass `user_id` as a query parameter."
+            ),
+            openapi_extra={
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "image/*": {"schema": {"type": "string", "format": "binary"}},
+                        "multipart/form-data": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "image": {"type": "string", "format": "binary"},
+                                    "user_id": {"type": "string"}
+                                },
+                                "required": ["image"]
+                            }
+                        },
+                        "application/json": {"schema": ExerciseAnalysisRequest.model_json_schema()}
+                    }
+                }
+            }
         )
     
-    async def analyze_exercise(self, request: ExerciseAnalysisRequest):
+    async def analyze_exercise(self, request: Request, user_id: Optional[str] = None):
         """
         Analyze exercise form from an image and provide feedback.
         
         Args:
-            request: ExerciseAnalysisRequest containing the base64 encoded image and optional parameters
+            request: The incoming request with a raw image, multipart or JSON body
+            user_id: Optional user ID, used when the body does not carry one
             
         Returns:
             dict: Contains the feedback from the analysis
         """
         try:
-            # Validate base64 image
-            try:
-                image_data = base64.b64decode(request.image)
-            except Exception as e:
-                raise HTTPException(
-                    status_code=400,
-                    detail="Invalid base64 image encoding"
-                )
+            image_data, user_id = await self._read_image(request, user_id)
             
             # Analyze the frame
             feedback = await self.vision_service.analyze_frame(
                 frame_data=image_data,
                 exercise_type=None,
-                user_id=request.user_id
+                user_id=user_id,
+                fallback=False
             )
             
             if feedback is None:
@@ -61,7 +81,7 @@ class ExerciseRouter:
             
             return {
                 "feedback": feedback,
-                "user_id": request.user_id
+                "user_id": user_id
             }
             
         except HTTPException:
@@ -71,4 +91,64 @@ class ExerciseRouter:
             raise HTTPException(
                 status_code=500,
                 detail=f"Internal server error: {str(e)}"
-            ) 
\ No newline at end of file
+            )
+
+    async def _read_image(self, request: Request, user_id: Optional[str]) -> Tuple[bytes, Optional[str]]:
+        """
+        Extract the image bytes and user ID from the request body.
+        
+        Raw and multipart bodies are read without any base64 round trip, straight
+        into one buffer that is returned without copying; the size limit is
+        enforced as the bytes arrive.
+        """
+        content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+        
+        if content_type.startswith("image/") or content_type == "application/octet-stream":
+            content_length = request.headers.get("content-length")
+            if content_length and content_length.isdigit() and int(content_length) > settings.MAX_IMAGE_UPLOAD_BYTES:
+                raise HTTPException(status_code=413, detail="Image too large")
+            body = bytearray()
+            async for chunk in request.stream():
+                body.extend(chunk)
+                if len(body) > settings.MAX_IMAGE_UPLOAD_BYTES:
+                    raise HTTPException(status_code=413, detail="Image too large")
+            if not body:
+                raise HTTPException(status_code=400, detail="Empty image body")
+            return body, user_id
+        
+        if content_type == "multipart/form-data":
+            image = None
+            form_user_id = bytearray()
+            async for part, data in iter_multipart(request, settings.MAX_IMAGE_UPLOAD_BYTES, settings.MAX_FORM_FIELD_BYTES):
+                if part.name == "image" and part.filename is not None:
+                    if image is None:
+                        image, image_part = bytearray(), part
+                    elif part is not image_part:
+                        raise HTTPException(status_code=400, detail="Only one image file can be uploaded")
+                    image.extend(data)
+                elif part.name == "user_id":
+                    form_user_id.extend(data)
+            if image is None:
+                raise HTTPException(status_code=400, detail="Missing image file field")
+            if not image:
+                raise HTTPException(status_code=400, detail="Empty image file")
+            return image, form_user_id.decode(errors="replace") or user_id
+        
+        # JSON body with a base64 encoded image
+        try:
+            payload = ExerciseAnalysisRequest.model_validate_json(await request.body())
+        except ValidationError:
+            raise HTTPException(
+                status_code=422,
+                detail="Expected an image/* body, a multipart form with an image field, or JSON with a base64 image"
+            )
+        
+        # Validate base64 image
+        try:
+            image_data = base64.b64decode(payload.image)
+        except Exception as e:
+            raise HTTPException(
+                status_code=400,
+                detail="Invalid base64 image encoding"
+            )
+        return image_data, payload.user_id or user_id
@@ -0,0 +1,28 @@
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from typing import Optional
+from app.managers.drain import DrainManager
+from app.managers.startup import StartupManager
+
+class HealthRouter:
+    def __init__(self, startup_manager: StartupManager, drain_manager: Optional[DrainManager] = None):
+        self.startup_manager = startup_manager
+        self.drain_manager = drain_manager
+        self.router = APIRouter(prefix="/health", tags=["health"])
+        self.setup_routes()
+
+    def setup_routes(self):
+        @self.router.get("/live")
+        async def liveness():
+            # The event loop is answering; nothing else is checked so a slow
+            # upstream never gets the container restarted
+            return {"status": "alive"}
+
+        @self.router.get("/ready")
+        async def readiness():
+            status = self.startup_manager.status()
+            if self.drain_manager is not None and self.drain_manager.draining:
+                # Take the worker out of rotation while its sessions are handed off
+                status["ready"] = False
+                status["draining"] = True
+            return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,153 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
+from typing import AsyncGenerator, Optional, Tuple
+from app.api.uploads import iter_multipart
+from app.core.config import settings
+from app.services.video_jobs import VideoJobService, VideoUpload
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+class JobRouter:
+    def __init__(self, job_service: VideoJobService):
+        self.router = APIRouter(prefix="/jobs", tags=["jobs"])
+        self.job_service = job_service
+
+        # Register routes
+        self.router.add_api_route(
+            "",
+            self.create_job,
+            methods=["POST"],
+            response_model=dict,
+            status_code=202,
+            summary="Submit a video for offline analysis",
+            description=(
+                "Uploads a video file (multipart) and starts analyzing its keyframes in the background. "
+                "The file is written to disk as it arrives and rejected with 413 once it exceeds the upload limit."
+            ),
+            openapi_extra={
+                "requestBody": {
+                    "required": True,
+                    "content": {
+                        "multipart/form-data": {
+                            "schema": {
+                                "type": "object",
+                                "properties": {
+                                    "file": {"type": "string", "format": "binary"},
+                                    "exercise_type": {"type": "string"}
+                                },
+                                "required": ["file"]
+                            }
+                        }
+                    }
+                }
+            }
+        )
+        self.router.add_api_route(
+            "/{job_id}",
+            self.get_job,
+            methods=["GET"],
+            response_model=dict,
+            summary="Get analysis job status",
+            description="Returns the progress of a video analysis job and, optionally, its results"
+        )
+        self.router.add_api_route(
+            "/{job_id}/results",
+            self.stream_results,
+            methods=["GET"],
+            summary="Stream analysis job results",
+            description="Streams results as newline-delimited JSON as they are produced, ending with the final job status"
+        )
+
+    async def create_job(self, request: Request):
+        """
+        Create a video analysis job from an uploaded file.
+
+        Args:
+            request: Multipart request with a `file` and an optional `exercise_type` field
+
+        Returns:
+            dict: The created job's status
+        """
+        content_length = request.headers.get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > settings.VIDEO_JOB_MAX_UPLOAD_BYTES:
+            raise HTTPException(status_code=413, detail="Video file too large")
+
+        upload, exercise_type = await self._receive_upload(request)
+        try:
+            job = await self.job_service.create_job(upload, exercise_type)
+        except Exception as e:
+            await upload.discard()
+            logger.error(f"Error creating video job: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Internal server error: {str(e)}"
+            )
+
+        return job.to_dict()
+
+    async def _receive_upload(self, request: Request) -> Tuple[VideoUpload, Optional[str]]:
+        """
+        Stream the request's video straight into its job file.
+
+        The upload limit is enforced as the bytes arrive, and a partial file is
+        deleted if the upload is rejected or the client goes away.
+        """
+        upload = None
+        exercise_type = bytearray()
+        complete = False
+        try:
+            async for part, data in iter_multipart(request, settings.VIDEO_JOB_MAX_UPLOAD_BYTES, settings.MAX_FORM_FIELD_BYTES):
+                if part.name == "file" and part.filename is not None:
+                    if upload is None:
+                        upload = await self.job_service.open_upload(part.filename)
+                        upload_part = part
+                    elif part is not upload_part:
+                        raise HTTPException(status_code=400, detail="Only one video file can be uploaded per job")
+                    if data:
+                        await upload.write(data)
+                elif part.name == "exercise_type":
+                    exercise_type.extend(data)
+            if upload is None:
+                raise HTTPException(status_code=400, detail="Missing video file field")
+            complete = True
+        except (HTTPException, ClientDisconnect):
+            raise
+        except Exception as e:
+            logger.error(f"Error receiving video upload: {str(e)}")
+            raise HTTPException(
+                status_code=500,
+                detail=f"Internal server error: {str(e)}"
+            )
+        finally:
+            if not complete and upload is not None:
+                await upload.discard()
+        return upload, exercise_type.decode(errors="replace") or None
+
+    async def get_job(self, job_id: str, include_results: bool = False):
+        job = self.job_service.get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+        return job.to_dict(include_results=include_results)
+
+    async def stream_results(self, job_id: str):
+        job = self.job_service.get_job(job_id)
+        if not job:
+            raise HTTPException(status_code=404, detail="Job not found")
+
+        async def generate() -> AsyncGenerator[str, None]:
+            sent = 0
+            while True:
+                # Check status before draining so results that land together with completion are not missed
+                finished = job.is_finished
+                while sent < len(job.results):
+                    yield json.dumps({"type": "result", **job.results[sent]}) + "\n"
+                    sent += 1
+                if finished:
+                    yield json.dumps({"type": "status", **job.to_dict()}) + "\n"
+                    return
+                await job.wait_for_update()
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
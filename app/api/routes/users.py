@@ -1,5 +1,7 @@
+from datetime import datetime
 from typing import Optional
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from app.core.config import settings
 from app.managers.connection import ConnectionManager
 
 class UserRouter:
@@ -17,11 +19,30 @@ class UserRouter:
             return session_info
 
         @self.router.get("/users/{client_id}/feedback")
-        async def get_user_feedback(client_id: str, limit: int = 10):
-            if client_id not in self.manager.feedback_history:
+        async def get_user_feedback(
+            client_id: str,
+            limit: int = Query(10, ge=1, le=settings.HISTORY_MAX_PAGE_SIZE),
+            cursor: Optional[str] = None,
+            since: Optional[datetime] = None,
+            until: Optional[datetime] = None
+        ):
+            if self.manager.history_store is None:
+                raise HTTPException(status_code=503, detail="Feedback history is not available")
+            try:
+                feedback, next_cursor = await self.manager.history_store.query(
+                    client_id,
+                    limit=limit,
+                    cursor=cursor,
+                    since=since,
+                    until=until
+                )
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            if not feedback and cursor is None:
                 raise HTTPException(status_code=404, detail="No feedback history found")
             return {
-                "feedback_history": self.manager.feedback_history[client_id][-limit:]
+                "feedback_history": feedback,
+                "next_cursor": next_cursor
             }
 
         @self.router.put("/users/{client_id}/exercise")
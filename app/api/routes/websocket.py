@@ -1,20 +1,33 @@
 from fastapi import WebSocket, WebSocketDisconnect
 from datetime import datetime
+from typing import Callable, Optional
+import asyncio
 import json
 import logging
 import traceback
 import base64
+import hmac
 import time
 
+from app.core.config import settings
 from app.managers.connection import ConnectionManager
-from app.services.vision import VisionService
+from app.managers.drain import DrainManager
+from app.services.stream_decoder import STREAM_FORMATS, create_stream_decoder
+from app.services.streaming import ClauseBuffer
+from app.services.vision import FallbackFeedback, VisionService
 
 logger = logging.getLogger(__name__)
 
 class WebSocketRouter:
-    def __init__(self, manager: ConnectionManager, vision_service: VisionService):
+    def __init__(
+        self,
+        manager: ConnectionManager,
+        vision_service: VisionService,
+        drain_manager: Optional[DrainManager] = None
+    ):
         self.manager = manager
         self.vision_service = vision_service
+        self.drain_manager = drain_manager
         self.logger = logging.getLogger(__name__)
 
     async def handle_exercise_analysis(
@@ -22,29 +35,45 @@ class WebSocketRouter:
         websocket: WebSocket,
         client_id: str,
         exercise_type: str = None,
-        audio_enabled: bool = True
+        audio_enabled: bool = None,
+        stream_feedback: bool = None,
+        audio_formats: str = None
     ):
+        if stream_feedback is None:
+            stream_feedback = settings.STREAM_FEEDBACK
         try:
             logger.info(f"Attempting WebSocket connection for client_id: {client_id}")
             await websocket.accept()
             logger.info(f"WebSocket accepted for client_id: {client_id}")
+            if self.drain_manager is not None and self.drain_manager.draining:
+                logger.info(f"Server draining, asking client_id: {client_id} to reconnect")
+                await self.drain_manager.reject(websocket)
+                return
             
             logger.info(f"Initializing connection in manager for client_id: {client_id}")
             await self.manager.connect(websocket, client_id)
+            await self._restore_session(websocket, client_id)
             logger.info(f"Connection initialized in manager for client_id: {client_id}")
 
             if exercise_type:
                 logger.info(f"Setting exercise type to {exercise_type} for client_id: {client_id}")
                 self.manager.update_exercise_type(client_id, exercise_type)
             
-            logger.info(f"Setting audio enabled to {audio_enabled} for client_id: {client_id}")
-            self.manager.toggle_audio(client_id, audio_enabled)
+            # Only an explicit query value overrides the default or a handed-off setting
+            if audio_enabled is not None:
+                logger.info(f"Setting audio enabled to {audio_enabled} for client_id: {client_id}")
+                self.manager.toggle_audio(client_id, audio_enabled)
+            
+            if audio_formats:
+                await self._negotiate_audio_format(websocket, client_id, audio_formats.split(","))
             
             try:
                 while True:
                     logger.info(f"Waiting for message from client_id: {client_id}")
                     message = await websocket.receive()
                     logger.info(f"Received message type: {message.get('type')} from client_id: {client_id}")
+                    if message.get('type') == 'websocket.disconnect':
+                        break
                     
                     try:
                         if message.get('type') == 'websocket.receive':
@@ -65,6 +94,9 @@ class WebSocketRouter:
                                             logger.info(f"Session deactivated for client_id: {client_id}")
                                             self.manager.update_session_active(client_id, False)
                                             continue
+                                        elif data.get('type') == 'audio_format':
+                                            await self._negotiate_audio_format(websocket, client_id, data.get('formats') or [])
+                                            continue
                                 except json.JSONDecodeError:
                                     # Not JSON, treat as base64 image data
                                     frame_data = message['text'].strip()
@@ -96,9 +128,42 @@ class WebSocketRouter:
                                 logger.info(f"Skipping frame analysis - session not active for client_id: {client_id}")
                                 continue
                             
+                            retry_after = self.manager.reserve_analysis(client_id)
+                            if retry_after:
+                                logger.debug(f"Skipping frame analysis - rate limited for client_id: {client_id}")
+                                await websocket.send_text(json.dumps({
+                                    "type": "rate_limited",
+                                    "retry_after": round(retry_after, 3)
+                                }))
+                                continue
+                            
+                            if stream_feedback:
+                                logger.info(f"Streaming analysis for client_id: {client_id}, exercise_type: {current_exercise}")
+                                feedback_text = await self._stream_feedback(
+                                    websocket,
+                                    client_id,
+                                    base64.b64decode(frame_data),
+                                    current_exercise,
+                                    self.manager.can_generate_audio(client_id),
+                                    is_active=lambda: self.manager.is_session_active(client_id)
+                                )
+                                if feedback_text:
+                                    self.manager.add_feedback(client_id, {
+                                        "timestamp": datetime.now().isoformat(),
+                                        "feedback": feedback_text,
+                                        "exercise_type": current_exercise,
+                                        "audio_available": self.manager.can_generate_audio(client_id),
+                                        "fallback": isinstance(feedback_text, FallbackFeedback)
+                                    })
+                                    session.last_activity = datetime.now()
+                                continue
+                            
                             # Analyze the frame
                             logger.info(f"Processing frame for client_id: {client_id}, exercise_type: {current_exercise}")
-                            feedback_text = await self.vision_service.analyze_frame(frame_data, current_exercise)
+                            feedback_text = await self.vision_service.analyze_frame(
+                                base64.b64decode(frame_data),
+                                current_exercise
+                            )
                             logger.info(f"Frame analysis completed for client_id: {client_id}, feedback: {feedback_text}")
                             
                             if not feedback_text or feedback_text.startswith("Error analyzing frame"):
@@ -115,7 +180,8 @@ class WebSocketRouter:
                                 "timestamp": datetime.now().isoformat(),
                                 "feedback": feedback_text,
                                 "exercise_type": current_exercise,
-                                "audio_available": self.manager.can_generate_audio(client_id)
+                                "audio_available": self.manager.can_generate_audio(client_id),
+                                "fallback": isinstance(feedback_text, FallbackFeedback)
                             }
                             
                             # Store feedback in history
@@ -128,8 +194,7 @@ class WebSocketRouter:
                             if session.is_active:
                                 await self.manager.send_message(
                                     json.dumps(feedback_data),
-                                    client_id,
-                                    "text"
+                                    client_id
                                 )
                             
                                 # Handle audio feedback if enabled and session is active
@@ -138,8 +203,7 @@ class WebSocketRouter:
                                     try:
                                         audio_data = await self.manager.audio_manager.generate_feedback(
                                             feedback_text,
-                                           "IAZxNqwaUCKERlavhDxB",
-                                            session.voice_settings
+                                            session.audio_format.output_format
                                         )
                                         if audio_data and session.is_active:
                                             logger.info(f"Sending audio chunk of size {len(audio_data)} bytes")
@@ -162,14 +226,15 @@ class WebSocketRouter:
                         }))
                         continue
                 
+                logger.info(f"WebSocket disconnected for client_id: {client_id}")
+                await self.manager.disconnect(websocket, client_id)
             except WebSocketDisconnect:
                 logger.info(f"WebSocket disconnected for client_id: {client_id}")
-                self.manager.disconnect(client_id)
+                await self.manager.disconnect(websocket, client_id)
             except Exception as e:
                 logger.error(f"Error in WebSocket connection for client_id: {client_id}: {str(e)}")
                 logger.error(f"Traceback: {traceback.format_exc()}")
-                await self.manager.send_message(str(e), client_id, "error")
-                self.manager.disconnect(client_id)
+                await self.manager.disconnect(websocket, client_id)
         except Exception as outer_e:
             logger.error(f"Error during WebSocket setup for client_id: {client_id}: {str(outer_e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
@@ -183,21 +248,77 @@ class WebSocketRouter:
         websocket: WebSocket,
         client_id: str,
         exercise_type: str = None,
-        audio_enabled: bool = True
+        audio_enabled: bool = None,
+        stream_feedback: bool = None,
+        stream_format: str = None,
+        audio_formats: str = None
     ):
         """
         Handle video stream WebSocket connection.
         
+        By default every binary message is a standalone image. With `stream_format`
+        set, binary messages are consecutive chunks of one encoded stream (MJPEG,
+        WebM or fragmented MP4) that is decoded on the server; only sampled frames
+        are analyzed, and frames arriving while an analysis runs replace each other.
+        
         Args:
             websocket: The WebSocket connection
             client_id: Unique identifier for the client
             exercise_type: Type of exercise being performed
-            audio_enabled: Whether to generate audio feedback
+            audio_enabled: Whether to generate audio feedback; defaults to the handed-off
+                session's setting, or True
+            stream_feedback: Whether to stream feedback text and start audio on the first clause
+            stream_format: Optional encoded stream format, one of "mjpeg", "webm" or "mp4"
+            audio_formats: Optional comma-separated audio format families in order of preference
         """
+        if stream_feedback is None:
+            stream_feedback = settings.STREAM_FEEDBACK
+        decoder = None
+        analyzer = None
         try:
             await websocket.accept()
+            if stream_format and stream_format not in STREAM_FORMATS:
+                self.logger.warning(f"Unsupported stream format {stream_format} from client {client_id}")
+                await websocket.close(code=1003, reason=f"Unsupported stream format: {stream_format}")
+                return
+            
+            if self.drain_manager is not None and self.drain_manager.draining:
+                self.logger.info(f"Server draining, asking client {client_id} to reconnect")
+                await self.drain_manager.reject(websocket)
+                return
+            
             await self.manager.connect(websocket, client_id)
+            restored = await self._restore_session(websocket, client_id)
+            if restored and not exercise_type:
+                exercise_type = restored.get("exercise_type")
+            if audio_enabled is None:
+                audio_enabled = restored.get("audio_enabled", True) if restored else True
+            # Keep the session in sync so the state is handed off on drain
+            if exercise_type:
+                self.manager.update_exercise_type(client_id, exercise_type)
+            self.manager.toggle_audio(client_id, audio_enabled)
             self.logger.info(f"Started video stream for client {client_id}")
+            
+            if audio_formats:
+                await self._negotiate_audio_format(websocket, client_id, audio_formats.split(","))
+
+            if stream_format:
+                loop = asyncio.get_running_loop()
+                latest_frame = asyncio.Queue(maxsize=1)
+                decoder = create_stream_decoder(
+                    stream_format,
+                    lambda frame: loop.call_soon_threadsafe(self._offer_latest, latest_frame, frame)
+                )
+                decoder.start()
+                analyzer = asyncio.create_task(self._analyze_stream_frames(
+                    websocket,
+                    client_id,
+                    latest_frame,
+                    exercise_type,
+                    audio_enabled,
+                    stream_feedback
+                ))
+                self.logger.info(f"Decoding {stream_format} stream for client {client_id}")
 
             try:
                 while True:
@@ -216,30 +337,25 @@ class WebSocketRouter:
                         # Handle different message types
                         if message_type == 'websocket.receive':
                             if 'bytes' in message:
-                                frame_data = message['bytes']
-                                # Process the frame with vision service
-                                self.logger.debug(f"Processing frame for client {client_id}, size: {len(frame_data)} bytes")
-                                feedback = await self.vision_service.analyze_frame(
-                                    frame_data,
-                                    exercise_type=exercise_type,
-                                    user_id=client_id
-                                )
+                                if decoder is not None:
+                                    if not decoder.feed(message['bytes']):
+                                        self.logger.warning(f"Closing video stream for client {client_id}: {decoder.error}")
+                                        await websocket.send_text(json.dumps({
+                                            "type": "error",
+                                            "data": decoder.error
+                                        }))
+                                        await websocket.close(code=1011, reason="Stream decoding stopped")
+                                        break
+                                    continue
                                 
-                                if audio_enabled and feedback:
-                                    # Generate audio feedback
-                                    self.logger.debug(f"Generating audio feedback for client {client_id}")
-                                    audio_data = await self.manager.audio_manager.generate_feedback(feedback)
-                                    
-                                    if audio_data and isinstance(audio_data, bytes):
-                                        # Send audio back to client
-                                        self.logger.debug(f"Sending audio feedback to client {client_id}, size: {len(audio_data)} bytes")
-                                        try:
-                                            await websocket.send_bytes(audio_data)
-                                            self.logger.debug("Audio feedback sent successfully")
-                                        except Exception as send_error:
-                                            self.logger.error(f"Error sending audio feedback: {str(send_error)}")
-                                    else:
-                                        self.logger.warning(f"No valid audio data generated for client {client_id}")
+                                await self._process_video_frame(
+                                    websocket,
+                                    client_id,
+                                    message['bytes'],
+                                    exercise_type,
+                                    audio_enabled,
+                                    stream_feedback
+                                )
                             else:
                                 try:
                                     # Try to parse as JSON control message
@@ -250,6 +366,8 @@ class WebSocketRouter:
                                         if msg_type in ['start_session', 'stop_session', 'pause_session', 'resume_session']:
                                             self.logger.info(f"Received control message {msg_type} from client {client_id}")
                                             # Handle session state changes here if needed
+                                        elif msg_type == 'audio_format':
+                                            await self._negotiate_audio_format(websocket, client_id, control_message.get('formats') or [])
                                 except json.JSONDecodeError:
                                     self.logger.error(f"Received message without bytes from client {client_id}: {message}")
                         else:
@@ -270,6 +388,10 @@ class WebSocketRouter:
             finally:
                 # Always clean up the connection
                 self.logger.info(f"Cleaning up connection for client {client_id}")
+                if decoder is not None:
+                    decoder.close()
+                if analyzer is not None:
+                    analyzer.cancel()
                 await self.manager.disconnect(websocket, client_id)
                 
         except Exception as e:
@@ -285,4 +407,302 @@ class WebSocketRouter:
             finally:
                 await self.manager.disconnect(websocket, client_id)
 
-    # ... rest of the existing code ... 
\ No newline at end of file
+    async def handle_watch(self, websocket: WebSocket, client_id: str, token: str = None):
+        """
+        Subscribe a viewer (e.g. an instructor dashboard) to a session's feedback.
+        
+        The viewer receives every feedback message and audio clip of the session,
+        delivered through its own queue so it never slows down the session or
+        other viewers. Text sent by the viewer is only used for pings. Viewers
+        must present WATCH_TOKEN; without it configured, watching is disabled.
+        
+        Args:
+            websocket: The viewer's WebSocket connection
+            client_id: The session to watch
+            token: The viewer token, from the `token` query parameter or `X-Watch-Token` header
+        """
+        token = token or websocket.headers.get("x-watch-token")
+        if not settings.WATCH_TOKEN or not token or not hmac.compare_digest(token.encode(), settings.WATCH_TOKEN.encode()):
+            self.logger.warning(f"Rejected viewer for {client_id}: missing or invalid watch token")
+            # Closing before accepting refuses the handshake with 403
+            await websocket.close(code=1008)
+            return
+        
+        await websocket.accept()
+        if self.drain_manager is not None and self.drain_manager.draining:
+            await self.drain_manager.reject(websocket)
+            return
+        subscriber = self.manager.broadcast_hub.subscribe(websocket, client_id)
+        if subscriber is None:
+            self.logger.warning(f"Rejected subscriber for {client_id}: subscriber limit reached")
+            await websocket.close(code=1013, reason="Too many subscribers")
+            return
+        
+        try:
+            subscriber.offer(("text", json.dumps({
+                "type": "subscribed",
+                "client_id": client_id,
+                "subscribers": self.manager.broadcast_hub.subscriber_count(client_id)
+            })))
+            while not subscriber.closed:
+                message = await websocket.receive()
+                if message.get('type') == 'websocket.disconnect':
+                    break
+                if message.get('text'):
+                    try:
+                        data = json.loads(message['text'])
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(data, dict) and data.get('type') == 'ping':
+                        subscriber.offer(("text", json.dumps({'type': 'pong'})))
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            self.logger.error(f"Error in subscriber connection for {client_id}: {str(e)}")
+        finally:
+            self.manager.broadcast_hub.unsubscribe(subscriber)
+
+    async def _restore_session(self, websocket: WebSocket, client_id: str) -> Optional[dict]:
+        """Restore a session handed off by a draining worker and tell the client what was restored."""
+        if self.drain_manager is None:
+            return None
+        state = await self.drain_manager.restore(client_id)
+        if state:
+            await websocket.send_text(json.dumps({
+                "type": "session_restored",
+                "exercise_type": state.get("exercise_type"),
+                "is_active": state.get("is_active", False),
+                "feedback_count": len(state.get("feedback_history") or []),
+                "audio_format": (state.get("audio_format") or {}).get("family")
+            }))
+        return state
+
+    async def _negotiate_audio_format(self, websocket: WebSocket, client_id: str, formats: list):
+        """Apply the client's audio format preferences and confirm the chosen format."""
+        if isinstance(formats, str):
+            formats = [formats]
+        reply = self.manager.negotiate_audio_format(client_id, [str(family) for family in formats])
+        if reply:
+            await websocket.send_text(json.dumps(reply))
+
+    async def _process_video_frame(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        frame_data: bytes,
+        exercise_type: str = None,
+        audio_enabled: bool = True,
+        stream_feedback: bool = False
+    ):
+        """Analyze one video frame and send the feedback audio back to the client."""
+        if self.manager.reserve_analysis(client_id):
+            self.logger.debug(f"Dropping frame for client {client_id}: rate limited")
+            return
+        
+        if stream_feedback:
+            self.logger.debug(f"Streaming analysis for client {client_id}, size: {len(frame_data)} bytes")
+            feedback = await self._stream_feedback(
+                websocket,
+                client_id,
+                frame_data,
+                exercise_type,
+                audio_enabled
+            )
+            self._record_feedback(client_id, feedback, exercise_type, audio_enabled)
+            return
+        
+        # Process the frame with vision service
+        self.logger.debug(f"Processing frame for client {client_id}, size: {len(frame_data)} bytes")
+        feedback = await self.vision_service.analyze_frame(
+            frame_data,
+            exercise_type=exercise_type,
+            user_id=client_id
+        )
+        self._record_feedback(client_id, feedback, exercise_type, audio_enabled)
+        
+        if audio_enabled and feedback:
+            # Generate audio feedback
+            self.logger.debug(f"Generating audio feedback for client {client_id}")
+            audio_data = await self.manager.audio_manager.generate_feedback(
+                feedback,
+                self.manager.get_audio_format(client_id)
+            )
+            
+            if audio_data and isinstance(audio_data, bytes):
+                # Send audio back to client
+                self.logger.debug(f"Sending audio feedback to client {client_id}, size: {len(audio_data)} bytes")
+                self.manager.broadcast_audio(client_id, audio_data)
+                try:
+                    await self.manager.send_audio_to(websocket, client_id, audio_data)
+                    self.logger.debug("Audio feedback sent successfully")
+                except Exception as send_error:
+                    self.logger.error(f"Error sending audio feedback: {str(send_error)}")
+            else:
+                self.logger.warning(f"No valid audio data generated for client {client_id}")
+
+    def _record_feedback(self, client_id: str, feedback: Optional[str], exercise_type: str, audio_enabled: bool):
+        """Store feedback in the session and the persistent history."""
+        if not feedback:
+            return
+        self.manager.add_feedback(client_id, {
+            "timestamp": datetime.now().isoformat(),
+            "feedback": feedback,
+            "exercise_type": exercise_type,
+            "audio_available": audio_enabled,
+            "fallback": isinstance(feedback, FallbackFeedback)
+        })
+
+    async def _analyze_stream_frames(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        frames: asyncio.Queue,
+        exercise_type: str = None,
+        audio_enabled: bool = True,
+        stream_feedback: bool = False
+    ):
+        """Analyze sampled frames from a decoded stream, one at a time, newest first."""
+        while True:
+            frame_data = await frames.get()
+            try:
+                await self._process_video_frame(
+                    websocket,
+                    client_id,
+                    frame_data,
+                    exercise_type,
+                    audio_enabled,
+                    stream_feedback
+                )
+            except Exception as frame_error:
+                self.logger.error(
+                    f"Error processing stream frame for client {client_id}: {str(frame_error)}\n"
+                    f"Traceback: {traceback.format_exc()}"
+                )
+
+    @staticmethod
+    def _offer_latest(frames: asyncio.Queue, frame_data: bytes):
+        # Drop the frame still waiting for analysis; only the newest one matters
+        if frames.full():
+            frames.get_nowait()
+        frames.put_nowait(frame_data)
+
+    async def _stream_feedback(
+        self,
+        websocket: WebSocket,
+        client_id: str,
+        frame_data: bytes,
+        exercise_type: str = None,
+        audio_enabled: bool = True,
+        is_active: Optional[Callable[[], bool]] = None
+    ) -> Optional[str]:
+        """
+        Stream feedback for a frame to the client as the model generates it.
+        
+        Text deltas are pushed as `feedback_delta` messages. Audio synthesis for the
+        first complete clause starts while the model is still generating and its
+        audio is sent as soon as it is ready, interleaved with the remaining deltas.
+        The rest of the sentence is synthesized once the stream closes and follows
+        the final `feedback_done` message. Audio chunks are always sent in order.
+        
+        Args:
+            websocket: The WebSocket connection
+            client_id: Unique identifier for the client
+            frame_data: Raw bytes of the image
+            exercise_type: Type of exercise being performed
+            audio_enabled: Whether to generate audio feedback
+            is_active: Optional check whether the session still wants feedback; once it
+                returns False nothing more is sent for this frame
+            
+        Returns:
+            Optional[str]: The complete feedback text or None if analysis produced nothing
+            or the session stopped while streaming
+        """
+        clauses = ClauseBuffer()
+        audio_format = self.manager.get_audio_format(client_id)
+        audio_tasks = []
+        # Synthesis tasks in speaking order, consumed by the audio sender
+        audio_queue: asyncio.Queue = asyncio.Queue()
+        audio_sender = None
+        parts = []
+        fallback = False
+        
+        def active() -> bool:
+            return is_active is None or is_active()
+        
+        def synthesize(text: str):
+            task = asyncio.create_task(self.manager.audio_manager.generate_feedback(text, audio_format))
+            audio_tasks.append(task)
+            audio_queue.put_nowait(task)
+        
+        async def send_audio_in_order():
+            while True:
+                task = await audio_queue.get()
+                if task is None:
+                    return
+                audio_data = await task
+                if not audio_data or not active():
+                    continue
+                self.logger.debug(f"Sending streamed audio to client {client_id}, size: {len(audio_data)} bytes")
+                self.manager.broadcast_audio(client_id, audio_data)
+                try:
+                    await self.manager.send_audio_to(websocket, client_id, audio_data)
+                except Exception as send_error:
+                    self.logger.error(f"Error sending streamed audio to client {client_id}: {str(send_error)}")
+                    return
+        
+        try:
+            if audio_enabled:
+                audio_sender = asyncio.create_task(send_audio_in_order())
+            
+            async for delta in self.vision_service.analyze_frame_stream(
+                frame_data,
+                exercise_type=exercise_type,
+                user_id=client_id
+            ):
+                if not active():
+                    self.logger.info(f"Session stopped while streaming feedback for client {client_id}")
+                    return None
+                fallback = fallback or isinstance(delta, FallbackFeedback)
+                parts.append(delta)
+                await websocket.send_text(json.dumps({
+                    "type": "feedback_delta",
+                    "data": delta
+                }))
+                
+                clause = clauses.feed(delta)
+                if clause and audio_enabled:
+                    self.logger.debug(f"Starting early audio synthesis for client {client_id}: {clause}")
+                    synthesize(clause)
+            
+            feedback = "".join(parts).strip()
+            if fallback:
+                feedback = FallbackFeedback(feedback)
+            if not feedback or not active():
+                if not feedback:
+                    self.logger.warning(f"Streaming analysis produced no feedback for client {client_id}")
+                return None
+            
+            remainder = clauses.flush()
+            if remainder and audio_enabled:
+                synthesize(remainder)
+            
+            await websocket.send_text(json.dumps({
+                "type": "feedback_done",
+                "timestamp": datetime.now().isoformat(),
+                "feedback": feedback,
+                "exercise_type": exercise_type,
+                "audio_available": bool(audio_tasks),
+                "fallback": fallback
+            }))
+            
+            if audio_sender is not None:
+                audio_queue.put_nowait(None)
+                await audio_sender
+            
+            return feedback
+        finally:
+            if audio_sender is not None and not audio_sender.done():
+                audio_sender.cancel()
+            for task in audio_tasks:
+                if not task.done():
+                    task.cancel() 
\ No newline at end of file
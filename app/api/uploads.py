@@ -0,0 +1,104 @@
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from fastapi import HTTPException, Request
+from multipart.exceptions import MultipartParseError
+from multipart.multipart import MultipartParser, parse_options_header
+
+class FormPart:
+    """One part of a multipart body: its field name, file name (for file parts) and size so far."""
+
+    def __init__(self, name: str, filename: Optional[str]):
+        self.name = name
+        self.filename = filename
+        self.size = 0
+
+async def iter_multipart(
+    request: Request,
+    max_file_size: int,
+    max_field_size: int
+) -> AsyncIterator[Tuple[FormPart, bytes]]:
+    """
+    Parse a multipart/form-data body as it arrives, without spooling it.
+
+    Each part is yielded once with empty data when its headers are complete, then
+    with its data in the order it is received. The caller decides where the bytes
+    go; part sizes are enforced as the bytes arrive, so an oversized upload is
+    rejected after at most one extra chunk.
+
+    Args:
+        request: Request with a multipart/form-data body
+        max_file_size: Largest allowed file part in bytes
+        max_field_size: Largest allowed text field in bytes
+
+    Yields:
+        Tuple[FormPart, bytes]: The part and its next piece of data
+
+    Raises:
+        HTTPException: 400 if the body is not a complete multipart form, 413 if a part is too large
+    """
+    content_type, options = parse_options_header(request.headers.get("content-type", ""))
+    boundary = options.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise HTTPException(status_code=400, detail="Expected a multipart/form-data body")
+
+    events: List[Tuple[FormPart, bytes]] = []
+    headers: Dict[bytes, bytes] = {}
+    header_field: List[bytes] = []
+    header_value: List[bytes] = []
+    state = {"part": None, "finished": False}
+
+    def on_part_begin():
+        headers.clear()
+
+    def on_header_field(data: bytes, start: int, end: int):
+        header_field.append(data[start:end])
+
+    def on_header_value(data: bytes, start: int, end: int):
+        header_value.append(data[start:end])
+
+    def on_header_end():
+        headers[b"".join(header_field).lower()] = b"".join(header_value)
+        header_field.clear()
+        header_value.clear()
+
+    def on_headers_finished():
+        _, disposition = parse_options_header(headers.get(b"content-disposition", b""))
+        filename = disposition.get(b"filename")
+        part = FormPart(
+            disposition.get(b"name", b"").decode("latin-1"),
+            filename.decode("latin-1") if filename is not None else None
+        )
+        state["part"] = part
+        events.append((part, b""))
+
+    def on_part_data(data: bytes, start: int, end: int):
+        events.append((state["part"], data[start:end]))
+
+    def on_end():
+        state["finished"] = True
+
+    parser = MultipartParser(boundary, {
+        "on_part_begin": on_part_begin,
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_end": on_end,
+    })
+
+    async for chunk in request.stream():
+        try:
+            parser.write(chunk)
+        except MultipartParseError:
+            raise HTTPException(status_code=400, detail="Malformed multipart body")
+        ready = events[:]
+        events.clear()
+        for part, data in ready:
+            part.size += len(data)
+            limit = max_file_size if part.filename is not None else max_field_size
+            if part.size > limit:
+                raise HTTPException(status_code=413, detail=f"Form field '{part.name}' is larger than {limit} bytes")
+            yield part, data
+
+    if not state["finished"]:
+        raise HTTPException(status_code=400, detail="Incomplete multipart body")
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -28,6 +29,118 @@ class Settings:
     STREAM_THRESHOLD: int = 50  # Character length threshold
     RATE_LIMIT_INTERVAL: float = 1.0  # seconds
     
+    # Audio Format Settings
+    # Format families clients can negotiate, each a ladder from highest to lowest bitrate.
+    # Speech stays intelligible at 32kbps, a quarter of the 128kbps music-grade MP3 default
+    # of the API; opus and mp3 start at the lowest bitrate ElevenLabs offers, so only pcm
+    # has rungs to step down. pcm is uncompressed (128-256kbps) and meant for clients that
+    # cannot decode audio cheaply, not for saving bandwidth.
+    AUDIO_FORMATS: dict = {
+        "opus": ["opus_48000_32"],
+        "mp3": ["mp3_22050_32"],
+        "pcm": ["pcm_16000", "pcm_8000"],
+    }
+    DEFAULT_AUDIO_FORMAT: str = "mp3"
+    AUDIO_STEP_DOWN_SEND_TIME: float = 0.25  # seconds; slower audio sends mean the socket is backing up
+    AUDIO_STEP_UP_SEND_TIME: float = 0.05  # seconds
+    AUDIO_STEP_UP_AFTER: int = 5  # Consecutive fast sends before stepping back up
+    
+    # Streaming Feedback Settings
+    STREAM_FEEDBACK: bool = os.getenv("STREAM_FEEDBACK", "false").lower() == "true"
+    STREAM_CLAUSE_MIN_CHARS: int = 20  # Shortest clause worth starting TTS on
+    
+    # Vision Settings
+    VISION_MODEL: str = os.getenv("VISION_MODEL", "gpt-4o-mini")
+    VISION_MAX_TOKENS: int = 100
+    
+    # Upstream Resilience Settings
+    VISION_TIMEOUT: float = 12.0  # seconds, total budget including retries
+    TTS_TIMEOUT: float = 8.0  # seconds, total budget including retries
+    HEDGE_PERCENTILE: float = 0.95  # Latency percentile that triggers a hedged request
+    HEDGE_DEFAULT_DELAY: float = 3.0  # seconds, used until enough latency samples exist
+    HEDGE_MIN_DELAY: float = 0.5  # seconds
+    HEDGE_MIN_SAMPLES: int = 20
+    HEDGE_LATENCY_WINDOW: int = 200
+    HEDGE_BUDGET_RATIO: float = 0.1  # At most ~10% extra requests from hedging
+    RETRY_ATTEMPTS: int = 2  # Retries after the first attempt on idempotent calls
+    RETRY_BASE_DELAY: float = 0.2  # seconds
+    RETRY_MAX_DELAY: float = 2.0  # seconds
+    BREAKER_FAILURE_THRESHOLD: int = 5
+    BREAKER_RESET_TIMEOUT: float = 30.0  # seconds
+    VISION_FALLBACK_PHRASES: list = [
+        "Keep it steady and controlled, you're doing great!",
+        "Stay tight through your core and keep breathing!",
+        "Nice work, focus on smooth, controlled reps!",
+    ]
+    
+    # Frame Result Cache Settings
+    FRAME_CACHE_ENABLED: bool = os.getenv("FRAME_CACHE_ENABLED", "true").lower() == "true"
+    FRAME_CACHE_SIZE: int = 256  # entries
+    FRAME_CACHE_TTL: float = 30.0  # seconds
+    FRAME_CACHE_MAX_DISTANCE: int = 4  # Hamming distance (of 64 bits) treated as the same frame
+    
+    # Encoded Video Stream Settings
+    VIDEO_STREAM_SAMPLE_INTERVAL: float = 1.0  # seconds of stream time between analyzed frames
+    VIDEO_STREAM_KEYFRAMES_ONLY: bool = False  # Decode only keyframes of WebM/MP4 streams
+    VIDEO_STREAM_FRAME_WIDTH: int = 768
+    VIDEO_STREAM_JPEG_QUALITY: int = 80
+    VIDEO_STREAM_MAX_BUFFER: int = 4 * 1024 * 1024  # Largest MJPEG frame accepted
+    
+    # REST Upload Settings
+    MAX_IMAGE_UPLOAD_BYTES: int = 20 * 1024 * 1024  # 20MB
+    MAX_FORM_FIELD_BYTES: int = 1024  # Text fields of multipart uploads
+    
+    # Video Job Settings
+    VIDEO_JOB_DIR: str = os.getenv("VIDEO_JOB_DIR", os.path.join(tempfile.gettempdir(), "video-jobs"))
+    VIDEO_JOB_MAX_UPLOAD_BYTES: int = 2 * 1024 * 1024 * 1024  # 2GB
+    VIDEO_JOB_UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # 1MB
+    VIDEO_JOB_WORKERS: int = os.cpu_count() or 2  # Keyframe extraction processes
+    VIDEO_JOB_ANALYSIS_CONCURRENCY: int = 8  # Concurrent vision requests across all jobs
+    VIDEO_JOB_SEGMENTS_AHEAD: int = VIDEO_JOB_WORKERS  # Segments decoded ahead of analysis per job
+    VIDEO_JOB_KEYFRAME_QUEUE_SIZE: int = 32  # Extracted keyframes waiting for analysis per job
+    VIDEO_JOB_SAMPLE_INTERVAL: float = 1.0  # seconds between sampled frames
+    VIDEO_JOB_SEGMENT_SECONDS: float = 30.0  # Video length decoded by one worker task
+    VIDEO_JOB_MIN_FRAME_DIFF: float = 4.0  # Mean pixel difference below which a frame is skipped
+    VIDEO_JOB_FRAME_WIDTH: int = 768
+    VIDEO_JOB_JPEG_QUALITY: int = 80
+    VIDEO_JOB_RETENTION: float = 3600.0  # seconds finished jobs are kept
+    
+    # Feedback History Settings
+    HISTORY_DB_PATH: str = os.getenv("HISTORY_DB_PATH", "data/feedback_history.db")
+    HISTORY_QUEUE_SIZE: int = 10000  # Records waiting to be written before new ones are dropped
+    HISTORY_BATCH_SIZE: int = 500  # Records per write transaction
+    HISTORY_FLUSH_INTERVAL: float = 0.5  # seconds a batch waits to fill up
+    HISTORY_MAX_PAGE_SIZE: int = 500
+    SESSION_FEEDBACK_HISTORY: int = 50  # Recent feedback kept in memory per session
+    
+    # Broadcast Settings
+    BROADCAST_MAX_SUBSCRIBERS: int = 500  # Viewers per session
+    BROADCAST_QUEUE_SIZE: int = 32  # Messages queued per viewer before the drop policy applies
+    BROADCAST_DROP_POLICY: str = "drop_oldest"  # drop_oldest, drop_newest or disconnect
+    WATCH_TOKEN: str = os.getenv("WATCH_TOKEN")  # Viewers must present it; watching is disabled without it
+    
+    # Drain & Session Handoff Settings
+    HANDOFF_DIR: str = os.getenv("HANDOFF_DIR", "data/handoff")  # Must be shared by all workers
+    HANDOFF_TTL: float = 300.0  # seconds a handed-off session can be restored
+    DRAIN_TIMEOUT: float = 10.0  # seconds to wait for drained sessions to close
+    DRAIN_RECONNECT_MIN_DELAY: float = 1.0  # seconds; clients reconnect at a random delay in this range
+    DRAIN_RECONNECT_MAX_DELAY: float = 10.0
+    
+    # Trace Settings
+    TRACE_RECORDING_ENABLED: bool = os.getenv("TRACE_RECORDING_ENABLED", "false").lower() == "true"
+    TRACE_DIR: str = os.getenv("TRACE_DIR", "data/traces")
+    TRACE_BUFFER_SIZE: int = 256 * 1024  # bytes buffered before a trace is written to disk
+    TRACE_QUEUE_SIZE: int = 1024  # Records waiting for the writer thread before new ones are dropped
+    
+    # Startup Settings
+    STARTUP_WARMUP_TIMEOUT: float = 20.0  # seconds per warm-up task
+    WARMUP_MODULES: list = ["numpy", "cv2", "PIL.Image", "av"]
+    
+    # Runtime Configuration Settings
+    ADMIN_TOKEN: str = os.getenv("ADMIN_TOKEN")  # The admin API is disabled without it
+    CONFIG_FILE: str = os.getenv("CONFIG_FILE")  # Optional JSON file of tunable overrides, watched for changes
+    CONFIG_WATCH_INTERVAL: float = 2.0  # seconds
+    
     # CORS Settings
     CORS_ORIGINS: list = ["*"]  # In production, replace with specific origins
     CORS_CREDENTIALS: bool = True
@@ -0,0 +1,230 @@
+import asyncio
+import json
+import logging
+import os
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class Tunable:
+    """A setting that may be changed while the server runs, with its type and valid range."""
+
+    def __init__(
+        self,
+        name: str,
+        type_: type,
+        minimum: float = None,
+        maximum: float = None,
+        choices: Sequence[Any] = None,
+        description: str = "",
+        requires: str = None
+    ):
+        self.name = name
+        self.type = type_
+        self.minimum = minimum
+        self.maximum = maximum
+        self.choices = choices
+        self.description = description
+        # Startup-only boolean setting without which this tunable has no effect
+        self.requires = requires
+
+    def validate(self, value: Any) -> Any:
+        """
+        Check a new value and convert it to the setting's type.
+
+        Raises:
+            ValueError: If the value has the wrong type or is out of range, or the
+                setting has no effect in this process
+        """
+        if self.requires and not getattr(settings, self.requires):
+            raise ValueError(f"{self.name} has no effect because {self.requires} was off at startup")
+        if self.type is bool:
+            if not isinstance(value, bool):
+                raise ValueError(f"{self.name} must be a boolean")
+        elif self.type is int:
+            if isinstance(value, bool) or not isinstance(value, int):
+                raise ValueError(f"{self.name} must be an integer")
+        elif self.type is float:
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{self.name} must be a number")
+            value = float(value)
+        elif self.type is str:
+            if not isinstance(value, str) or not value:
+                raise ValueError(f"{self.name} must be a non-empty string")
+
+        if self.minimum is not None and value < self.minimum:
+            raise ValueError(f"{self.name} must be at least {self.minimum}")
+        if self.maximum is not None and value > self.maximum:
+            raise ValueError(f"{self.name} must be at most {self.maximum}")
+        choices = self.choices() if callable(self.choices) else self.choices
+        if choices is not None and value not in choices:
+            raise ValueError(f"{self.name} must be one of {list(choices)}")
+        return value
+
+    def to_dict(self) -> dict:
+        choices = self.choices() if callable(self.choices) else self.choices
+        return {
+            "value": getattr(settings, self.name),
+            "type": self.type.__name__,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "choices": list(choices) if choices is not None else None,
+            "description": self.description,
+            "active": not self.requires or bool(getattr(settings, self.requires)),
+        }
+
+# Performance knobs that are safe to change under load. Everything else in
+# Settings is read once at startup and still needs a restart.
+TUNABLES: Dict[str, Tunable] = {tunable.name: tunable for tunable in [
+    # Vision
+    Tunable("VISION_MODEL", str, choices=("gpt-4o-mini", "gpt-4o"), description="Model used for frame analysis"),
+    Tunable("VISION_MAX_TOKENS", int, 16, 500, description="Maximum feedback length in tokens"),
+    Tunable("RETRY_ATTEMPTS", int, 0, 5, description="Retries after the first attempt on idempotent upstream calls"),
+    Tunable("RATE_LIMIT_INTERVAL", float, 0.0, 60.0, description="Minimum seconds between analyzed frames of one session"),
+    # Frame rates and sampling
+    Tunable("VIDEO_STREAM_SAMPLE_INTERVAL", float, 0.1, 60.0, description="Seconds of stream time between analyzed frames"),
+    Tunable("VIDEO_JOB_SAMPLE_INTERVAL", float, 0.1, 60.0, description="Seconds between sampled frames of uploaded videos"),
+    Tunable("VIDEO_JOB_MIN_FRAME_DIFF", float, 0.0, 255.0, description="Mean pixel difference below which a keyframe is skipped"),
+    # Concurrency
+    Tunable("VIDEO_JOB_ANALYSIS_CONCURRENCY", int, 1, 128, description="Concurrent vision requests across all video jobs"),
+    # Image size and quality
+    Tunable("VIDEO_STREAM_FRAME_WIDTH", int, 160, 3840, description="Width decoded stream frames are scaled down to"),
+    Tunable("VIDEO_STREAM_JPEG_QUALITY", int, 10, 100, description="JPEG quality of decoded stream frames"),
+    Tunable("VIDEO_JOB_FRAME_WIDTH", int, 160, 3840, description="Width video job keyframes are scaled down to"),
+    Tunable("VIDEO_JOB_JPEG_QUALITY", int, 10, 100, description="JPEG quality of video job keyframes"),
+    # Cache budgets
+    Tunable("AUDIO_CACHE_SIZE", int, 0, 100000, description="Synthesized phrases kept in memory"),
+    Tunable("FRAME_CACHE_SIZE", int, 1, 100000, description="Vision results kept per perceptual hash", requires="FRAME_CACHE_ENABLED"),
+    Tunable("FRAME_CACHE_TTL", float, 1.0, 3600.0, description="Seconds a cached vision result stays valid", requires="FRAME_CACHE_ENABLED"),
+    Tunable("FRAME_CACHE_MAX_DISTANCE", int, 0, 64, description="Hamming distance treated as the same frame", requires="FRAME_CACHE_ENABLED"),
+    # Streaming and audio
+    Tunable("STREAM_CLAUSE_MIN_CHARS", int, 1, 500, description="Shortest streamed clause worth starting TTS on"),
+    Tunable("DEFAULT_AUDIO_FORMAT", str, choices=lambda: settings.AUDIO_FORMATS.keys(), description="Audio format family for new sessions"),
+    Tunable("AUDIO_STEP_DOWN_SEND_TIME", float, 0.01, 10.0, description="Audio send time that steps a session's bitrate down"),
+    Tunable("AUDIO_STEP_UP_SEND_TIME", float, 0.0, 10.0, description="Audio send time that counts toward stepping back up"),
+    Tunable("BROADCAST_QUEUE_SIZE", int, 1, 10000, description="Messages queued per new viewer"),
+]}
+
+# Rules between tunables, checked against the values an update would leave in place
+CONSTRAINTS: List[Tuple[Callable[[Dict[str, Any]], bool], str]] = [
+    (
+        lambda values: values["AUDIO_STEP_UP_SEND_TIME"] < values["AUDIO_STEP_DOWN_SEND_TIME"],
+        "AUDIO_STEP_UP_SEND_TIME must be below AUDIO_STEP_DOWN_SEND_TIME"
+    ),
+]
+
+class RuntimeConfig:
+    """
+    Applies validated changes to the tunable settings while the server runs.
+
+    An update is validated as a whole, including the rules between settings, and
+    rejected if any value is invalid. It is then applied in one step on the event
+    loop, so no request sees half of it, and subscribers (e.g. components that
+    size a semaphore or cache from a setting) are called with the changed values.
+    Updates come from the admin API or from CONFIG_FILE, a JSON object of
+    overrides that is polled for changes.
+    """
+
+    def __init__(self, config_file: str = None):
+        self.config_file = config_file if config_file is not None else settings.CONFIG_FILE
+        self.version = 0
+        self._subscribers: List[Callable[[Dict[str, Any]], None]] = []
+        self._file_mtime: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, callback: Callable[[Dict[str, Any]], None]):
+        """Call `callback` with the changed settings after each update."""
+        self._subscribers.append(callback)
+
+    def snapshot(self) -> dict:
+        return {
+            "version": self.version,
+            "settings": {name: tunable.to_dict() for name, tunable in TUNABLES.items()},
+        }
+
+    def update(self, changes: Dict[str, Any], source: str = "api") -> Dict[str, Any]:
+        """
+        Validate and apply changes to tunable settings.
+
+        Args:
+            changes: New values by setting name
+            source: Where the change came from, for the log
+
+        Returns:
+            Dict[str, Any]: The settings whose values actually changed
+
+        Raises:
+            ValueError: If any setting is unknown or any value invalid; nothing is applied
+        """
+        if not isinstance(changes, dict):
+            raise ValueError("Configuration must be an object of setting names to values")
+        errors = []
+        validated = {}
+        for name, value in changes.items():
+            tunable = TUNABLES.get(name)
+            if tunable is None:
+                errors.append(f"{name} is not a tunable setting")
+                continue
+            try:
+                validated[name] = tunable.validate(value)
+            except ValueError as e:
+                errors.append(str(e))
+        if not errors:
+            values = {name: getattr(settings, name) for name in TUNABLES}
+            values.update(validated)
+            errors = [message for check, message in CONSTRAINTS if not check(values)]
+        if errors:
+            raise ValueError("; ".join(errors))
+
+        changed = {name: value for name, value in validated.items() if getattr(settings, name) != value}
+        if not changed:
+            return changed
+        for name, value in changed.items():
+            setattr(settings, name, value)
+        self.version += 1
+        logger.info(f"Configuration version {self.version} from {source}: {changed}")
+
+        for callback in self._subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                logger.error(f"Configuration subscriber failed: {str(e)}")
+        return changed
+
+    def start(self):
+        """Start watching CONFIG_FILE, if one is configured."""
+        if self.config_file:
+            self._task = asyncio.create_task(self._watch())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _watch(self):
+        logger.info(f"Watching {self.config_file} for configuration changes")
+        while True:
+            try:
+                await self._reload_file()
+            except Exception as e:
+                logger.error(f"Ignoring configuration file {self.config_file}: {str(e)}")
+            await asyncio.sleep(settings.CONFIG_WATCH_INTERVAL)
+
+    async def _reload_file(self):
+        try:
+            mtime = os.path.getmtime(self.config_file)
+        except FileNotFoundError:
+            return
+        if mtime == self._file_mtime:
+            return
+        self._file_mtime = mtime
+        changes = await asyncio.to_thread(self._read_file)
+        self.update(changes, source=self.config_file)
+
+    def _read_file(self) -> Dict[str, Any]:
+        with open(self.config_file) as config_file:
+            return json.load(config_file)
@@ -1,15 +1,25 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from elevenlabs.client import ElevenLabs
+import asyncio
 import logging
 
 from app.core.config import settings
+from app.core.runtime_config import RuntimeConfig
 from app.managers.audio import AudioFeedbackManager
 from app.managers.connection import ConnectionManager
+from app.managers.drain import DrainManager
+from app.managers.startup import StartupManager, import_modules
 from app.services.vision import VisionService
+from app.services.video_jobs import VideoJobService
+from app.services.history import FeedbackHistoryStore
+from app.services.trace import record_session
 from app.api.routes.websocket import WebSocketRouter
 from app.api.routes.users import UserRouter
 from app.api.routes.exercise import ExerciseRouter
+from app.api.routes.jobs import JobRouter
+from app.api.routes.health import HealthRouter
+from app.api.routes.admin import AdminRouter
 
 # Configure logging
 logging.basicConfig(
@@ -19,8 +29,30 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Heavy modules and upstream clients are loaded concurrently in the background,
+    # so the server answers liveness probes immediately and reports readiness when done
+    startup_manager.add_check("modules", lambda: import_modules(settings.WARMUP_MODULES))
+    startup_manager.add_check("history", lambda: asyncio.to_thread(history_store.start))
+    startup_manager.add_check("openai", vision_service.warm_up, required=False)
+    startup_manager.add_check(
+        "elevenlabs",
+        lambda: audio_manager.warm_up(settings.VISION_FALLBACK_PHRASES),
+        required=False
+    )
+    startup_manager.add_check("handoff", drain_manager.warm_up, required=False)
+    startup_manager.start()
+    drain_manager.install_signal_handler()
+    runtime_config.start()
+    yield
+    await runtime_config.stop()
+    await startup_manager.stop()
+    video_job_service.shutdown()
+    await asyncio.to_thread(history_store.close)
+
 # Initialize FastAPI app
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION)
+app = FastAPI(title=settings.PROJECT_NAME, version=settings.VERSION, lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -31,48 +63,78 @@ app.add_middleware(
     allow_headers=settings.CORS_HEADERS,
 )
 
-# Initialize services and managers
-eleven_client = ElevenLabs(api_key=settings.ELEVENLABS_API_KEY)
-audio_manager = AudioFeedbackManager(eleven_client)
-connection_manager = ConnectionManager(audio_manager)
+# Initialize services and managers (clients are created lazily, see lifespan)
+startup_manager = StartupManager()
+audio_manager = AudioFeedbackManager()
+history_store = FeedbackHistoryStore()
+connection_manager = ConnectionManager(audio_manager, history_store)
 vision_service = VisionService()
+video_job_service = VideoJobService(vision_service)
+drain_manager = DrainManager(connection_manager, vision_service)
+
+# Components sized from tunable settings are updated when they change at runtime
+runtime_config = RuntimeConfig()
+runtime_config.subscribe(vision_service.apply_settings)
+runtime_config.subscribe(video_job_service.apply_settings)
 
 # Initialize routers
-websocket_router = WebSocketRouter(connection_manager, vision_service)
+websocket_router = WebSocketRouter(connection_manager, vision_service, drain_manager)
 user_router = UserRouter(connection_manager)
 exercise_router = ExerciseRouter(vision_service)
+job_router = JobRouter(video_job_service)
+health_router = HealthRouter(startup_manager, drain_manager)
+admin_router = AdminRouter(runtime_config)
 
 # Add routes
 app.include_router(user_router.router)
 app.include_router(exercise_router.router)
+app.include_router(job_router.router)
+app.include_router(health_router.router)
+app.include_router(admin_router.router)
 
 @app.websocket("/ws/exercise-analysis/{client_id}")
 async def websocket_endpoint(
     websocket: WebSocket,
     client_id: str,
     exercise_type: str = None,
-    audio_enabled: bool = True
+    audio_enabled: bool = None,
+    stream_feedback: bool = None,
+    audio_formats: str = None,
+    record: bool = False
 ):
-    await websocket_router.handle_exercise_analysis(
-        websocket,
-        client_id,
-        exercise_type,
-        audio_enabled
-    )
+    params = {
+        "exercise_type": exercise_type,
+        "audio_enabled": audio_enabled,
+        "stream_feedback": settings.STREAM_FEEDBACK if stream_feedback is None else stream_feedback,
+        "audio_formats": audio_formats,
+    }
+    with record_session(websocket, "exercise-analysis", client_id, params, record) as session_socket:
+        await websocket_router.handle_exercise_analysis(session_socket, client_id, **params)
 
 @app.websocket("/ws/video-stream/{client_id}")
 async def video_stream_endpoint(
     websocket: WebSocket,
     client_id: str,
     exercise_type: str = None,
-    audio_enabled: bool = True
+    audio_enabled: bool = None,
+    stream_feedback: bool = None,
+    stream_format: str = None,
+    audio_formats: str = None,
+    record: bool = False
 ):
-    await websocket_router.handle_video_stream(
-        websocket,
-        client_id,
-        exercise_type,
-        audio_enabled
-    )
+    params = {
+        "exercise_type": exercise_type,
+        "audio_enabled": audio_enabled,
+        "stream_feedback": settings.STREAM_FEEDBACK if stream_feedback is None else stream_feedback,
+        "stream_format": stream_format,
+        "audio_formats": audio_formats,
+    }
+    with record_session(websocket, "video-stream", client_id, params, record) as session_socket:
+        await websocket_router.handle_video_stream(session_socket, client_id, **params)
+
+@app.websocket("/ws/watch/{client_id}")
+async def watch_endpoint(websocket: WebSocket, client_id: str, token: str = None):
+    await websocket_router.handle_watch(websocket, client_id, token)
 
 @app.get("/")
 async def root():
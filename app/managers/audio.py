@@ -1,54 +1,145 @@
+import asyncio
 import json
-from typing import AsyncGenerator, Optional
-from elevenlabs.client import ElevenLabs
+from typing import TYPE_CHECKING, AsyncGenerator, Dict, List, Optional
 from app.core.config import settings
+from app.services.resilience import UpstreamPolicy
+from app.services.trace import record_upstream
 import logging
+import time
 from datetime import datetime
 
+if TYPE_CHECKING:
+    from elevenlabs.client import ElevenLabs
+
 logger = logging.getLogger(__name__)
 
 class AudioFeedbackManager:
-    def __init__(self, eleven_client: ElevenLabs):
-        self.eleven_client = eleven_client
+    def __init__(self, eleven_client: Optional["ElevenLabs"] = None, use_cache: bool = True):
+        # Without an injected client, one is created on first use or by warm_up()
+        self._eleven_client = eleven_client
+        self.use_cache = use_cache  # Off when replaying traces, which record cache hits themselves
         self.logger = logging.getLogger(__name__)
         self.voice_id = "IAZxNqwaUCKERlavhDxB"  # Default voice ID
         self._cache = {}  # Simple cache for frequently used phrases
+        self._bank = {}  # Pre-synthesized fallback phrases, never evicted
+        self._pending = {}  # In-flight synthesis per cache key, shared by concurrent requests
+        self.policy = UpstreamPolicy("elevenlabs", timeout=settings.TTS_TIMEOUT)
         logger.info("Initialized AudioFeedbackManager")
 
-    async def generate_feedback(self, feedback_text: str) -> Optional[bytes]:
+    @property
+    def eleven_client(self) -> "ElevenLabs":
+        if self._eleven_client is None:
+            from elevenlabs.client import ElevenLabs
+            self._eleven_client = ElevenLabs(api_key=settings.ELEVENLABS_API_KEY, timeout=settings.TTS_TIMEOUT)
+            logger.info("ElevenLabs client initialized")
+        return self._eleven_client
+
+    async def warm_up(self, phrases: List[str]):
+        """
+        Create the ElevenLabs client off the event loop and pre-load the fallback phrase bank.
+
+        Phrases are banked in every format of AUDIO_FORMATS, so a session gets
+        fallback audio whichever family it negotiated and whichever rung it is on.
+        """
+        await asyncio.to_thread(lambda: self.eleven_client)
+        await asyncio.gather(*(
+            self.warm_phrase_bank(phrases, output_format)
+            for ladder in settings.AUDIO_FORMATS.values()
+            for output_format in ladder
+        ))
+
+    async def generate_feedback(self, feedback_text: str, output_format: str = None) -> Optional[bytes]:
         """
         Generate audio feedback using ElevenLabs API.
         
         Args:
             feedback_text: The text to convert to speech
+            output_format: ElevenLabs output format, defaults to the first rung of DEFAULT_AUDIO_FORMAT
             
         Returns:
-            Optional[bytes]: Audio data in bytes or None if generation fails
+            Optional[bytes]: Audio data in bytes, or None if generation fails and no
+            cached audio exists, in which case the caller sends text-only feedback
         """
         try:
             if not feedback_text:
                 return None
 
-            self.logger.debug(f"Generating audio for text: {feedback_text}")
+            output_format = output_format or settings.AUDIO_FORMATS[settings.DEFAULT_AUDIO_FORMAT][0]
+            bank_key = (feedback_text, output_format)
+            if self.use_cache and bank_key in self._bank:
+                record_upstream("tts", 0.0, size=len(self._bank[bank_key]), cached=True)
+                return self._bank[bank_key]
             
-            # Generate audio using ElevenLabs
-            audio_generator = self.eleven_client.text_to_speech.convert(
-                text=feedback_text,
-                voice_id="IAZxNqwaUCKERlavhDxB",
-                model_id="eleven_multilingual_v2",
-                output_format="mp3_44100_128",
-            )
-            
-            # Convert generator to bytes
-            audio_bytes = b''.join(chunk for chunk in audio_generator)
-            self.logger.debug(f"Generated audio size: {len(audio_bytes)} bytes")
-            
-            return audio_bytes
+            # Each phrase is stored once per format
+            cache_key = f"{feedback_text}:{self.voice_id}:{output_format}"
+            if self.use_cache and cache_key in self._cache:
+                self.logger.debug("Found audio in cache")
+                record_upstream("tts", 0.0, size=len(self._cache[cache_key]), cached=True)
+                return self._cache[cache_key]
+
+            # Sessions asking for the same phrase at the same time share one synthesis
+            pending = self._pending.get(cache_key)
+            if pending is None:
+                pending = asyncio.ensure_future(self._generate(feedback_text, output_format, cache_key))
+                self._pending[cache_key] = pending
+                pending.add_done_callback(lambda _: self._pending.pop(cache_key, None))
+            return await asyncio.shield(pending)
 
         except Exception as e:
             self.logger.error(f"Error generating audio feedback: {str(e)}")
             return None
 
+    async def _generate(self, feedback_text: str, output_format: str, cache_key: str) -> bytes:
+        self.logger.debug(f"Generating {output_format} audio for text: {feedback_text}")
+        
+        # Run the blocking ElevenLabs call in a worker thread so synthesis
+        # can overlap with the vision stream that is still producing text.
+        # Synthesis is idempotent, so the policy may hedge and retry it.
+        started = time.monotonic()
+        try:
+            audio_bytes = await self.policy.call(
+                lambda: asyncio.to_thread(self._synthesize, feedback_text, output_format)
+            )
+        except Exception as e:
+            record_upstream("tts", time.monotonic() - started, error=str(e))
+            raise
+        record_upstream("tts", time.monotonic() - started, size=len(audio_bytes))
+        self.logger.debug(f"Generated audio size: {len(audio_bytes)} bytes")
+        
+        if self.use_cache:
+            if len(self._cache) > settings.AUDIO_CACHE_SIZE:
+                self._cache.clear()
+            self._cache[cache_key] = audio_bytes
+        
+        return audio_bytes
+
+    async def warm_phrase_bank(self, phrases: List[str], output_format: str = None):
+        """
+        Pre-synthesize fallback phrases so they can be played while providers are down.
+        
+        Args:
+            phrases: The phrases to synthesize
+            output_format: ElevenLabs output format, defaults to the first rung of DEFAULT_AUDIO_FORMAT
+        """
+        output_format = output_format or settings.AUDIO_FORMATS[settings.DEFAULT_AUDIO_FORMAT][0]
+        for phrase in phrases:
+            if (phrase, output_format) in self._bank:
+                continue
+            audio = await self.generate_feedback(phrase, output_format)
+            if audio:
+                self._bank[(phrase, output_format)] = audio
+        logger.info(f"Audio phrase bank holds {len(self._bank)} phrases after warming {output_format}")
+
+    def _synthesize(self, text: str, output_format: str) -> bytes:
+        """Generate audio using ElevenLabs and collect the generator into bytes."""
+        audio_generator = self.eleven_client.text_to_speech.convert(
+            text=text,
+            voice_id="IAZxNqwaUCKERlavhDxB",
+            model_id="eleven_multilingual_v2",
+            output_format=output_format,
+        )
+        return b''.join(chunk for chunk in audio_generator)
+
     async def generate_feedback_with_settings(self, text: str, voice_settings: dict) -> bytes:
         try:
             logger.info(f"Generating audio feedback for text of length {len(text)} with voice_id: {self.voice_id}")
@@ -99,4 +190,96 @@ class AudioFeedbackManager:
 
     def clear_cache(self):
         logger.info("Clearing audio cache")
-        self._cache.clear() 
\ No newline at end of file
+        self._cache.clear()
+
+    def export_cache(self) -> Dict[str, bytes]:
+        """Return a copy of the synthesized audio cache, e.g. to hand off to the next worker."""
+        return dict(self._cache)
+
+    def import_cache(self, entries: Dict[str, bytes]):
+        """Add previously synthesized audio to the cache without replacing newer entries."""
+        for cache_key, audio in entries.items():
+            if len(self._cache) >= settings.AUDIO_CACHE_SIZE:
+                break
+            self._cache.setdefault(cache_key, audio)
+        logger.info(f"Imported audio cache, {len(self._cache)} entries")
+
+class AdaptiveAudioFormat:
+    """
+    Audio format of one session, with bitrate adaptation.
+
+    The client picks a format family (see AUDIO_FORMATS); each family is a ladder of
+    ElevenLabs output formats from highest to lowest bitrate. When sending audio
+    to the client is slow, i.e. the socket's outbound buffer is backing up, the
+    session steps down one rung; after a run of fast sends it steps back up.
+    """
+
+    def __init__(self, family: str = None):
+        self.family = family or settings.DEFAULT_AUDIO_FORMAT
+        self.rung = 0
+        self._fast_sends = 0
+
+    @property
+    def output_format(self) -> str:
+        return settings.AUDIO_FORMATS[self.family][self.rung]
+
+    def negotiate(self, preferences: List[str]) -> bool:
+        """
+        Select the first supported family from the client's preferences.
+        
+        Args:
+            preferences: Format families in the client's order of preference
+            
+        Returns:
+            bool: Whether a supported family was found
+        """
+        for family in preferences:
+            family = family.strip().lower()
+            if family in settings.AUDIO_FORMATS:
+                self.family = family
+                self.rung = 0
+                self._fast_sends = 0
+                return True
+        return False
+
+    def record_send(self, seconds: float) -> bool:
+        """
+        Record how long sending one audio message took.
+        
+        Returns:
+            bool: Whether the output format changed as a result
+        """
+        ladder = settings.AUDIO_FORMATS[self.family]
+        if seconds >= settings.AUDIO_STEP_DOWN_SEND_TIME:
+            self._fast_sends = 0
+            if self.rung < len(ladder) - 1:
+                self.rung += 1
+                logger.info(f"Audio send took {seconds:.2f}s, stepping down to {self.output_format}")
+                return True
+            return False
+
+        if seconds <= settings.AUDIO_STEP_UP_SEND_TIME:
+            self._fast_sends += 1
+            if self._fast_sends >= settings.AUDIO_STEP_UP_AFTER and self.rung > 0:
+                self.rung -= 1
+                self._fast_sends = 0
+                logger.info(f"Audio sends recovered, stepping up to {self.output_format}")
+                return True
+        else:
+            self._fast_sends = 0
+        return False
+
+    def restore(self, family: str, rung: int = 0):
+        """Restore a format saved from another worker, ignoring families no longer supported."""
+        if family not in settings.AUDIO_FORMATS:
+            return
+        self.family = family
+        self.rung = min(max(int(rung), 0), len(settings.AUDIO_FORMATS[family]) - 1)
+        self._fast_sends = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "type": "audio_format",
+            "format": self.family,
+            "output_format": self.output_format
+        }
@@ -0,0 +1,165 @@
+import asyncio
+import json
+import logging
+from collections import deque
+from typing import Dict, List, Optional, Set, Tuple, Union
+from fastapi import WebSocket
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# A queued message is ("text", str) or ("bytes", bytes); the payload object is
+# shared by every subscriber's queue and never copied or re-serialized
+Message = Tuple[str, Union[str, bytes]]
+
+class Subscriber:
+    """
+    One viewer socket with its own bounded send queue.
+
+    A dedicated task drains the queue, so a slow viewer only delays itself.
+    When the queue is full the drop policy decides what gives: the oldest
+    queued message, the new message, or the viewer's connection.
+    """
+
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+    DISCONNECT = "disconnect"
+
+    def __init__(self, websocket: WebSocket, client_id: str, max_queue: int = None, drop_policy: str = None):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.max_queue = max_queue or settings.BROADCAST_QUEUE_SIZE
+        self.drop_policy = drop_policy or settings.BROADCAST_DROP_POLICY
+        self.dropped = 0
+        self.closed = False
+        self.overflowed = False
+        self._queue: "deque[Message]" = deque()
+        self._ready = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._send_loop())
+
+    def offer(self, message: Message):
+        if self.closed:
+            return
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            if self.drop_policy == self.DROP_NEWEST:
+                return
+            if self.drop_policy == self.DISCONNECT:
+                logger.warning(f"Disconnecting slow subscriber of {self.client_id} after queue overflow")
+                self.overflowed = True
+                self.close()
+                return
+            self._queue.popleft()
+        self._queue.append(message)
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._queue.clear()
+        self._ready.set()
+        if self._task is not None and asyncio.current_task() is not self._task:
+            self._task.cancel()
+
+    async def disconnect(self, message: str, code: int, reason: str):
+        """Stop delivering queued messages, send a final message and close the viewer's socket."""
+        self.close()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+        try:
+            await self.websocket.send_text(message)
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass
+
+    async def _send_loop(self):
+        try:
+            while not self.closed:
+                if not self._queue:
+                    self._ready.clear()
+                    await self._ready.wait()
+                    continue
+                kind, payload = self._queue.popleft()
+                if kind == "bytes":
+                    await self.websocket.send_bytes(payload)
+                else:
+                    await self.websocket.send_text(payload)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            logger.info(f"Subscriber of {self.client_id} stopped receiving: {str(e)}")
+        finally:
+            self.closed = True
+            if self.overflowed:
+                try:
+                    await self.websocket.close(code=1008, reason="Subscriber too slow")
+                except Exception:
+                    pass
+
+class BroadcastHub:
+    """
+    Fans out a session's feedback to any number of subscribed viewer sockets.
+
+    Each published message is serialized once and the same immutable str/bytes
+    object is queued for every subscriber, so the publisher's cost is one
+    serialization plus an O(1) enqueue per viewer and never waits on a socket.
+    """
+
+    def __init__(self):
+        self.subscribers: Dict[str, Set[Subscriber]] = {}
+
+    def subscribe(self, websocket: WebSocket, client_id: str) -> Optional[Subscriber]:
+        """
+        Subscribe a socket to a session's feedback.
+
+        Returns:
+            Optional[Subscriber]: The subscriber, or None if the session has too many subscribers
+        """
+        subscribers = self.subscribers.setdefault(client_id, set())
+        if len(subscribers) >= settings.BROADCAST_MAX_SUBSCRIBERS:
+            return None
+        subscriber = Subscriber(websocket, client_id)
+        subscriber.start()
+        subscribers.add(subscriber)
+        logger.info(f"New subscriber for {client_id}, {len(subscribers)} subscribers")
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        subscriber.close()
+        subscribers = self.subscribers.get(subscriber.client_id)
+        if subscribers is None:
+            return
+        subscribers.discard(subscriber)
+        if not subscribers:
+            del self.subscribers[subscriber.client_id]
+        logger.info(f"Subscriber left {subscriber.client_id}, {len(subscribers)} subscribers")
+
+    def all_subscribers(self) -> List[Subscriber]:
+        return [subscriber for subscribers in self.subscribers.values() for subscriber in subscribers]
+
+    def subscriber_count(self, client_id: str) -> int:
+        return len(self.subscribers.get(client_id, ()))
+
+    def publish_text(self, client_id: str, message: Union[dict, str]):
+        """Serialize a message once and queue it for every subscriber of the session."""
+        subscribers = self.subscribers.get(client_id)
+        if not subscribers:
+            return
+        payload = message if isinstance(message, str) else json.dumps(message)
+        self._fan_out(subscribers, ("text", payload))
+
+    def publish_bytes(self, client_id: str, data: bytes):
+        """Queue binary data (audio) for every subscriber of the session."""
+        subscribers = self.subscribers.get(client_id)
+        if not subscribers:
+            return
+        self._fan_out(subscribers, ("bytes", bytes(data)))
+
+    def _fan_out(self, subscribers: Set[Subscriber], message: Message):
+        for subscriber in list(subscribers):
+            if subscriber.closed:
+                self.unsubscribe(subscriber)
+                continue
+            subscriber.offer(message)
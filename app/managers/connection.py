@@ -1,11 +1,15 @@
+import asyncio
 import json
-from typing import Dict, Set
+import time
+from typing import Dict, List, Optional, Set
 from datetime import datetime
-from collections import defaultdict
+from collections import defaultdict, deque
 from fastapi import WebSocket
 from app.models.session import UserSession
-from app.managers.audio import AudioFeedbackManager
+from app.managers.audio import AdaptiveAudioFormat, AudioFeedbackManager
+from app.managers.broadcast import BroadcastHub
 from app.core.config import settings
+from app.services.history import FeedbackHistoryStore
 import logging
 
 logger = logging.getLogger(__name__)
@@ -17,15 +21,19 @@ class UserSession:
         self.audio_enabled = True
         self.voice_id = "IAZxNqwaUCKERlavhDxB"
         self.voice_settings = {}
-        self.feedback_history = []
+        self.feedback_history = deque(maxlen=settings.SESSION_FEEDBACK_HISTORY)
         self.last_activity = datetime.now()
         self.is_active = False
+        self.audio_format = AdaptiveAudioFormat()
+        self.last_analysis_at: Optional[float] = None
 
 class ConnectionManager:
-    def __init__(self, audio_manager: AudioFeedbackManager):
+    def __init__(self, audio_manager: AudioFeedbackManager, history_store: Optional[FeedbackHistoryStore] = None):
         self.active_connections: Dict[str, Set[WebSocket]] = {}
         self.user_sessions: Dict[str, UserSession] = {}
         self.audio_manager = audio_manager
+        self.history_store = history_store
+        self.broadcast_hub = BroadcastHub()
         self.logger = logging.getLogger(__name__)
 
     async def connect(self, websocket: WebSocket, client_id: str):
@@ -54,19 +62,23 @@ class ConnectionManager:
 
     async def send_message(self, message: str, client_id: str):
         """
-        Send a text message to a specific client.
+        Send a text message to all of a client's connections concurrently.
         """
         if client_id in self.active_connections:
-            for connection in self.active_connections[client_id]:
-                await connection.send_text(message)
+            await asyncio.gather(*(
+                connection.send_text(message)
+                for connection in list(self.active_connections[client_id])
+            ))
 
     async def send_bytes(self, data: bytes, client_id: str):
         """
-        Send binary data to a specific client.
+        Send binary data to all of a client's connections concurrently.
         """
         if client_id in self.active_connections:
-            for connection in self.active_connections[client_id]:
-                await connection.send_bytes(data)
+            await asyncio.gather(*(
+                connection.send_bytes(data)
+                for connection in list(self.active_connections[client_id])
+            ))
 
     def update_exercise_type(self, client_id: str, exercise_type: str):
         if client_id in self.user_sessions:
@@ -83,6 +95,25 @@ class ConnectionManager:
             self.user_sessions[client_id].audio_enabled = enabled
             self.logger.info(f"Updated audio enabled to {enabled} for client_id: {client_id}")
 
+    def reserve_analysis(self, client_id: str) -> float:
+        """
+        Rate-limit frame analysis to one per RATE_LIMIT_INTERVAL per session.
+        
+        Returns:
+            float: 0 if the frame may be analyzed now (the slot is taken), otherwise
+            the seconds until the next frame will be accepted
+        """
+        session = self.user_sessions.get(client_id)
+        if session is None:
+            return 0.0
+        now = time.monotonic()
+        if session.last_analysis_at is not None:
+            wait = session.last_analysis_at + settings.RATE_LIMIT_INTERVAL - now
+            if wait > 0:
+                return wait
+        session.last_analysis_at = now
+        return 0.0
+
     def can_generate_audio(self, client_id: str) -> bool:
         return (
             client_id in self.user_sessions
@@ -94,6 +125,50 @@ class ConnectionManager:
         if client_id in self.user_sessions:
             self.user_sessions[client_id].feedback_history.append(feedback)
             self.logger.info(f"Added feedback for client_id: {client_id}")
+        # Fallback phrases stand in for analysis while the provider is down; they
+        # are not coaching the user received, so they stay out of the history
+        if self.history_store is not None and not feedback.get("fallback"):
+            self.history_store.append(client_id, feedback)
+        self.broadcast_hub.publish_text(client_id, {"type": "feedback", **feedback})
+
+    def broadcast_audio(self, client_id: str, audio_data: bytes):
+        """Share a session's feedback audio with its subscribers."""
+        self.broadcast_hub.publish_bytes(client_id, audio_data)
+
+    def negotiate_audio_format(self, client_id: str, preferences: List[str]) -> Optional[dict]:
+        """
+        Pick the session's audio format from the client's preferred format families.
+        
+        Returns:
+            Optional[dict]: The `audio_format` message to send back, or None if the session is unknown
+        """
+        if client_id not in self.user_sessions:
+            return None
+        audio_format = self.user_sessions[client_id].audio_format
+        if not audio_format.negotiate(preferences):
+            self.logger.warning(f"No supported audio format in {preferences} for client_id: {client_id}, keeping {audio_format.family}")
+        self.logger.info(f"Audio format for client_id: {client_id} is {audio_format.output_format}")
+        return audio_format.to_dict()
+
+    def get_audio_format(self, client_id: str) -> Optional[str]:
+        """Return the ElevenLabs output format currently used for a client."""
+        if client_id not in self.user_sessions:
+            return None
+        return self.user_sessions[client_id].audio_format.output_format
+
+    async def send_audio_to(self, websocket: WebSocket, client_id: str, audio_data: bytes) -> None:
+        """
+        Send audio on one socket and adapt the session's bitrate to how fast it drains.
+        
+        A send only completes once the data fits in the socket's outbound buffer, so
+        its duration tracks buffering. If the format changes, the client is told
+        before the next audio message.
+        """
+        started = time.monotonic()
+        await websocket.send_bytes(audio_data)
+        session = self.user_sessions.get(client_id)
+        if session and session.audio_format.record_send(time.monotonic() - started):
+            await websocket.send_text(json.dumps(session.audio_format.to_dict()))
 
     async def send_audio(self, audio_data: bytes, client_id: str) -> None:
         """Send audio data to a specific client."""
@@ -111,14 +186,53 @@ class ConnectionManager:
                 logger.error(f"Client {client_id} not found in active connections")
                 return
 
-            websocket = self.active_connections[client_id]
-            await websocket.send_bytes(audio_data)
+            self.broadcast_audio(client_id, audio_data)
+            await asyncio.gather(*(
+                self.send_audio_to(websocket, client_id, audio_data)
+                for websocket in list(self.active_connections[client_id])
+            ))
             logger.info(f"Audio data sent to client {client_id}")
 
         except Exception as e:
             logger.error(f"Error sending audio to client {client_id}: {str(e)}")
             raise
 
+    def export_session(self, client_id: str) -> Optional[dict]:
+        """
+        Serialize a session's state so another worker can restore it.
+        
+        Returns:
+            Optional[dict]: JSON-serializable session state, or None if the session is unknown
+        """
+        session = self.user_sessions.get(client_id)
+        if session is None:
+            return None
+        return {
+            "exercise_type": session.exercise_type,
+            "audio_enabled": session.audio_enabled,
+            "is_active": session.is_active,
+            "voice_id": session.voice_id,
+            "voice_settings": session.voice_settings,
+            "feedback_history": list(session.feedback_history),
+            "audio_format": {"family": session.audio_format.family, "rung": session.audio_format.rung},
+        }
+
+    def restore_session(self, client_id: str, state: dict):
+        """Apply state exported by export_session() to a newly connected session."""
+        session = self.user_sessions.get(client_id)
+        if session is None:
+            return
+        session.exercise_type = state.get("exercise_type")
+        session.audio_enabled = state.get("audio_enabled", True)
+        session.is_active = state.get("is_active", False)
+        session.voice_id = state.get("voice_id", session.voice_id)
+        session.voice_settings = state.get("voice_settings") or {}
+        session.feedback_history.extend(state.get("feedback_history") or [])
+        audio_format = state.get("audio_format") or {}
+        if audio_format.get("family"):
+            session.audio_format.restore(audio_format["family"], audio_format.get("rung", 0))
+        self.logger.info(f"Restored handed-off session for client_id: {client_id}")
+
     def is_session_active(self, client_id: str) -> bool:
         return (
             client_id in self.user_sessions
@@ -0,0 +1,141 @@
+import asyncio
+import json
+import logging
+import random
+import signal
+from typing import Optional
+from fastapi import WebSocket
+from app.core.config import settings
+from app.managers.connection import ConnectionManager
+from app.services.handoff import SessionHandoffStore
+from app.services.vision import VisionService
+
+logger = logging.getLogger(__name__)
+
+# WebSocket close code for "Service Restart": the client should reconnect
+SERVICE_RESTART = 1012
+
+class DrainManager:
+    """
+    Drains a worker before it stops and restores sessions drained by other workers.
+
+    On SIGTERM the worker stops admitting sessions and reports not ready, saves
+    every session's state (and the synthesized audio cache) to the shared
+    handoff store, then tells each client and viewer to reconnect after a random
+    delay and closes its socket with 1012. The jitter spreads reconnects over
+    DRAIN_RECONNECT_MIN_DELAY..DRAIN_RECONNECT_MAX_DELAY instead of all clients
+    hitting the new workers at once. Once drained, the normal server shutdown runs.
+    """
+
+    def __init__(
+        self,
+        connection_manager: ConnectionManager,
+        vision_service: VisionService,
+        handoff_store: Optional[SessionHandoffStore] = None
+    ):
+        self.manager = connection_manager
+        self.vision_service = vision_service
+        self.handoff_store = handoff_store or SessionHandoffStore()
+        self.draining = False
+        self._task: Optional[asyncio.Task] = None
+
+    def install_signal_handler(self):
+        """Drain on SIGTERM, then hand over to the server's own shutdown."""
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, self._on_sigterm)
+        except (NotImplementedError, RuntimeError) as e:
+            logger.warning(f"Cannot drain on SIGTERM on this platform: {str(e)}")
+
+    def reconnect_hint(self) -> dict:
+        return {
+            "type": "reconnect",
+            "reason": "server_restart",
+            "delay": round(random.uniform(settings.DRAIN_RECONNECT_MIN_DELAY, settings.DRAIN_RECONNECT_MAX_DELAY), 2)
+        }
+
+    async def reject(self, websocket: WebSocket):
+        """Turn away an accepted socket while draining."""
+        try:
+            await websocket.send_text(json.dumps(self.reconnect_hint()))
+            await websocket.close(code=SERVICE_RESTART, reason="Server restarting")
+        except Exception:
+            pass
+
+    async def restore(self, client_id: str) -> Optional[dict]:
+        """
+        Restore a session handed off by a draining worker, if there is one.
+
+        Args:
+            client_id: Client that just connected
+
+        Returns:
+            Optional[dict]: The restored state, or None
+        """
+        try:
+            state = await asyncio.to_thread(self.handoff_store.load, client_id)
+        except Exception as e:
+            logger.error(f"Failed to load handoff for client_id {client_id}: {str(e)}")
+            return None
+        if not state:
+            return None
+        self.manager.restore_session(client_id, state)
+        self.vision_service.restore_history(client_id, state.get("vision_history"))
+        return state
+
+    async def warm_up(self):
+        """Load the audio cache saved by the last drained worker and drop expired handoffs."""
+        entries = await asyncio.to_thread(self.handoff_store.load_audio_cache)
+        if entries:
+            self.manager.audio_manager.import_cache(entries)
+        await asyncio.to_thread(self.handoff_store.purge_expired)
+
+    async def drain(self):
+        """Stop admitting sessions, hand off the open ones and wait for them to close."""
+        if self.draining:
+            return
+        self.draining = True
+        client_ids = list(self.manager.user_sessions)
+        logger.info(f"Draining {len(client_ids)} sessions")
+
+        states = {}
+        for client_id in client_ids:
+            state = self.manager.export_session(client_id)
+            if state is not None:
+                state["vision_history"] = self.vision_service.get_history(client_id)
+                states[client_id] = state
+        try:
+            await asyncio.to_thread(self._save, states)
+        except Exception as e:
+            logger.error(f"Failed to save session handoff: {str(e)}")
+
+        await asyncio.gather(*(
+            self.reject(websocket)
+            for client_id in client_ids
+            for websocket in list(self.manager.active_connections.get(client_id, ()))
+        ), *(
+            # Viewers reconnect too, to whichever worker the session moves to
+            subscriber.disconnect(json.dumps(self.reconnect_hint()), SERVICE_RESTART, "Server restarting")
+            for subscriber in self.manager.broadcast_hub.all_subscribers()
+        ))
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + settings.DRAIN_TIMEOUT
+        while self.manager.active_connections and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+        logger.info(f"Drain finished, {len(self.manager.active_connections)} sessions still open")
+
+    def _save(self, states: dict):
+        for client_id, state in states.items():
+            self.handoff_store.save(client_id, state)
+        if self.manager.audio_manager is not None:
+            self.handoff_store.save_audio_cache(self.manager.audio_manager.export_cache())
+
+    def _on_sigterm(self):
+        if self._task is not None:
+            # A second SIGTERM skips the rest of the drain
+            signal.raise_signal(signal.SIGINT)
+            return
+        logger.info("Received SIGTERM, draining sessions before shutdown")
+        self._task = asyncio.create_task(self.drain())
+        # The server's own SIGINT handling performs the regular graceful shutdown
+        self._task.add_done_callback(lambda _: signal.raise_signal(signal.SIGINT))
@@ -0,0 +1,108 @@
+import asyncio
+import importlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class StartupCheck:
+    PENDING = "pending"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, name: str, warm_up: Callable[[], Awaitable], required: bool = True):
+        self.name = name
+        self.warm_up = warm_up
+        self.required = required
+        self.status = self.PENDING
+        self.duration: float = None
+        self.error: str = None
+
+    def to_dict(self) -> dict:
+        return {
+            "status": self.status,
+            "required": self.required,
+            "duration_seconds": round(self.duration, 3) if self.duration is not None else None,
+            "error": self.error,
+        }
+
+class StartupManager:
+    """
+    Runs service warm-ups concurrently after the server starts accepting connections.
+
+    The process is live as soon as the app is imported. It becomes ready once every
+    warm-up has finished (or timed out) and all required ones succeeded; optional
+    warm-ups such as upstream connections only improve first-request latency.
+    """
+
+    def __init__(self):
+        self.checks: Dict[str, StartupCheck] = {}
+        self.started_at = time.monotonic()
+        self.ready_after: float = None
+        self._task: asyncio.Task = None
+
+    def add_check(self, name: str, warm_up: Callable[[], Awaitable], required: bool = True):
+        self.checks[name] = StartupCheck(name, warm_up, required)
+
+    @property
+    def finished(self) -> bool:
+        return all(check.status != StartupCheck.PENDING for check in self.checks.values())
+
+    @property
+    def is_ready(self) -> bool:
+        return self.finished and all(
+            check.status == StartupCheck.READY
+            for check in self.checks.values()
+            if check.required
+        )
+
+    def start(self):
+        """Start all warm-ups in the background."""
+        self._task = asyncio.create_task(self._run_all())
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    def status(self) -> dict:
+        return {
+            "ready": self.is_ready,
+            "ready_after_seconds": round(self.ready_after, 3) if self.ready_after is not None else None,
+            "checks": {name: check.to_dict() for name, check in self.checks.items()},
+        }
+
+    async def _run_all(self):
+        await asyncio.gather(*(self._run(check) for check in self.checks.values()))
+        self.ready_after = time.monotonic() - self.started_at
+        if self.is_ready:
+            logger.info(f"Service ready after {self.ready_after:.2f}s")
+        else:
+            failed = [name for name, check in self.checks.items() if check.required and check.status != StartupCheck.READY]
+            logger.error(f"Service not ready, required warm-ups failed: {failed}")
+
+    async def _run(self, check: StartupCheck):
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(check.warm_up(), settings.STARTUP_WARMUP_TIMEOUT)
+            check.status = StartupCheck.READY
+            logger.info(f"Warm-up {check.name} finished in {time.monotonic() - started:.2f}s")
+        except Exception as e:
+            check.status = StartupCheck.FAILED
+            check.error = str(e) or type(e).__name__
+            log = logger.error if check.required else logger.warning
+            log(f"Warm-up {check.name} failed: {check.error}")
+        finally:
+            check.duration = time.monotonic() - started
+
+async def import_modules(modules: List[str]):
+    """Import heavy modules in a worker thread so the event loop keeps serving."""
+    def _import():
+        for module in modules:
+            importlib.import_module(module)
+    await asyncio.to_thread(_import)
@@ -0,0 +1,68 @@
+import asyncio
+from typing import List, Optional, Dict, Any
+from datetime import datetime
+
+class VideoJob:
+    QUEUED = "queued"
+    PROCESSING = "processing"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+    def __init__(self, job_id: str, filename: str, video_path: str, exercise_type: Optional[str] = None):
+        self.job_id: str = job_id
+        self.filename: str = filename
+        self.video_path: str = video_path
+        self.exercise_type: Optional[str] = exercise_type
+        self.status: str = self.QUEUED
+        self.created_at: datetime = datetime.now()
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.duration_seconds: Optional[float] = None
+        self.segments_total: int = 0
+        self.segments_done: int = 0
+        self.frames_extracted: int = 0
+        self.frames_analyzed: int = 0
+        # Share of the job finished so far; it only ever grows. Half of each
+        # segment's share is credited when it is extracted, the other half is
+        # split over its keyframes as they are analyzed
+        self.work_done: float = 0.0
+        self.results: List[Dict[str, Any]] = []
+        self._updated = asyncio.Event()
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in (self.COMPLETED, self.FAILED)
+
+    @property
+    def progress(self) -> float:
+        if self.status == self.COMPLETED:
+            return 1.0
+        return round(min(self.work_done, 1.0), 3)
+
+    def notify(self):
+        """Wake up everyone waiting for new results or a status change."""
+        self._updated.set()
+        self._updated = asyncio.Event()
+
+    async def wait_for_update(self):
+        await self._updated.wait()
+
+    def to_dict(self, include_results: bool = False) -> Dict[str, Any]:
+        data = {
+            "job_id": self.job_id,
+            "filename": self.filename,
+            "exercise_type": self.exercise_type,
+            "status": self.status,
+            "progress": self.progress,
+            "created_at": self.created_at.isoformat(),
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "error": self.error,
+            "duration_seconds": self.duration_seconds,
+            "segments_total": self.segments_total,
+            "segments_done": self.segments_done,
+            "frames_extracted": self.frames_extracted,
+            "frames_analyzed": self.frames_analyzed,
+        }
+        if include_results:
+            data["results"] = sorted(self.results, key=lambda result: result["timestamp"])
+        return data
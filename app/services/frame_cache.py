@@ -0,0 +1,187 @@
+import asyncio
+import hashlib
+import io
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+HASH_SIZE = 8  # 8x8 difference hash, 64 bits
+
+def perceptual_hash(frame_data: bytes) -> Optional[int]:
+    """
+    Compute a 64-bit difference hash (dHash) of an image.
+
+    Near-identical frames (re-encodes, small sensor noise) produce hashes a few
+    bits apart, so the Hamming distance between hashes measures visual similarity.
+
+    Args:
+        frame_data: Raw bytes of the image
+
+    Returns:
+        Optional[int]: The hash, or None if the image cannot be decoded
+    """
+    from PIL import Image
+    
+    try:
+        image = Image.open(io.BytesIO(frame_data))
+        # Let the JPEG decoder downscale while decoding instead of decoding full size
+        image.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))
+        image = image.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BILINEAR)
+    except Exception as e:
+        logger.warning(f"Could not hash frame: {str(e)}")
+        return None
+
+    pixels = image.tobytes()
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return bits
+
+class FrameResultCache:
+    """
+    LRU cache of vision feedback keyed by perceptual hash and exercise type.
+
+    Byte-identical frames are found through a content digest without decoding
+    the image. Other frames are hashed and match any live entry for the same
+    exercise within `max_distance` bits. Decoding and the similarity scan run in
+    a worker thread, so a large upload never blocks the event loop; a lock keeps
+    the entries consistent between the loop and that thread.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None, max_distance: int = None):
+        self.max_entries = max_entries or settings.FRAME_CACHE_SIZE
+        self.ttl = ttl or settings.FRAME_CACHE_TTL
+        self.max_distance = max_distance if max_distance is not None else settings.FRAME_CACHE_MAX_DISTANCE
+        # (phash, exercise_type) -> (feedback, expires_at)
+        self._entries: "OrderedDict[Tuple[int, Optional[str]], Tuple[str, float]]" = OrderedDict()
+        # (digest, exercise_type) -> (phash, exercise_type)
+        self._digests: "OrderedDict[Tuple[bytes, Optional[str]], Tuple[int, Optional[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def digest(frame_data: bytes) -> bytes:
+        return hashlib.blake2b(frame_data, digest_size=16).digest()
+
+    async def get(self, frame_data: bytes, exercise_type: str = None) -> Tuple[Optional[str], Optional[int]]:
+        """
+        Look up feedback for a frame.
+
+        Args:
+            frame_data: Raw bytes of the image
+            exercise_type: Type of exercise being performed
+
+        Returns:
+            Tuple of the cached feedback (or None) and the frame's perceptual hash,
+            which callers pass back to put() to avoid hashing twice. The hash is
+            None when the frame was matched by digest or could not be decoded.
+        """
+        digest_key = (self.digest(frame_data), exercise_type)
+        with self._lock:
+            entry_key = self._digests.get(digest_key)
+            if entry_key is not None:
+                feedback = self._lookup(entry_key, time.monotonic())
+                if feedback is not None:
+                    self._digests.move_to_end(digest_key)
+                    self.hits += 1
+                    return feedback, None
+
+        return await asyncio.to_thread(self._get_similar, frame_data, digest_key, exercise_type)
+
+    def _get_similar(self, frame_data: bytes, digest_key, exercise_type: str) -> Tuple[Optional[str], Optional[int]]:
+        frame_hash = perceptual_hash(frame_data)
+        with self._lock:
+            if frame_hash is None:
+                self.misses += 1
+                return None, None
+
+            entry_key = self._find_similar(frame_hash, exercise_type, time.monotonic())
+            if entry_key is not None:
+                self._remember_digest(digest_key, entry_key)
+                self.hits += 1
+                return self._entries[entry_key][0], frame_hash
+
+            self.misses += 1
+            return None, frame_hash
+
+    def put(self, frame_data: bytes, frame_hash: Optional[int], exercise_type: str, feedback: str):
+        """Store feedback for a frame whose hash was returned by get()."""
+        if frame_hash is None or not feedback:
+            return
+        entry_key = (frame_hash, exercise_type)
+        digest_key = (self.digest(frame_data), exercise_type)
+        with self._lock:
+            self._entries[entry_key] = (feedback, time.monotonic() + self.ttl)
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._remember_digest(digest_key, entry_key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+
+    def configure(self, max_entries: int = None, ttl: float = None, max_distance: int = None):
+        """Change the cache's limits, evicting the least recently used entries if it shrinks."""
+        if max_entries is not None:
+            with self._lock:
+                self.max_entries = max_entries
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                while len(self._digests) > self.max_entries:
+                    self._digests.popitem(last=False)
+        if ttl is not None:
+            # Applies to entries stored from now on
+            self.ttl = ttl
+        if max_distance is not None:
+            self.max_distance = max_distance
+
+    def _lookup(self, entry_key, now: float) -> Optional[str]:
+        entry = self._entries.get(entry_key)
+        if entry is None:
+            return None
+        feedback, expires_at = entry
+        if expires_at <= now:
+            del self._entries[entry_key]
+            return None
+        self._entries.move_to_end(entry_key)
+        return feedback
+
+    def _find_similar(self, frame_hash: int, exercise_type: str, now: float):
+        if self._lookup((frame_hash, exercise_type), now) is not None:
+            return (frame_hash, exercise_type)
+        if self.max_distance <= 0:
+            return None
+
+        best_key, best_distance = None, self.max_distance + 1
+        expired = []
+        for key, (_, expires_at) in self._entries.items():
+            if expires_at <= now:
+                expired.append(key)
+                continue
+            if key[1] != exercise_type:
+                continue
+            distance = (key[0] ^ frame_hash).bit_count()
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        for key in expired:
+            del self._entries[key]
+
+        if best_key is not None:
+            self._entries.move_to_end(best_key)
+        return best_key
+
+    def _remember_digest(self, digest_key, entry_key):
+        self._digests[digest_key] = entry_key
+        self._digests.move_to_end(digest_key)
+        while len(self._digests) > self.max_entries:
+            self._digests.popitem(last=False)
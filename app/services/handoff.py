@@ -0,0 +1,134 @@
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+from typing import Any, Dict, Optional
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+AUDIO_CACHE_FILE = "audio-cache.bin"
+LENGTH = struct.Struct("<I")
+
+class SessionHandoffStore:
+    """
+    Session state handed from a draining worker to the worker a client reconnects to.
+
+    Each session is one JSON file in HANDOFF_DIR, which must be shared by all
+    workers (e.g. a mounted volume). Files are written atomically and removed
+    when loaded, so a session is restored at most once; unclaimed files expire
+    after HANDOFF_TTL. All methods block and are meant to run in a worker thread.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.HANDOFF_DIR
+
+    def save(self, client_id: str, state: Dict[str, Any]):
+        """
+        Save a session's state for the next worker.
+
+        Args:
+            client_id: Client the session belongs to
+            state: JSON-serializable session state
+        """
+        self._write(self._session_path(client_id), json.dumps({
+            "client_id": client_id,
+            "expires_at": time.time() + settings.HANDOFF_TTL,
+            "state": state,
+        }).encode())
+
+    def load(self, client_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Claim a session's saved state.
+
+        Returns:
+            Optional[Dict[str, Any]]: The state, or None if nothing unexpired was saved
+        """
+        path = self._session_path(client_id)
+        try:
+            # Rename first so two workers never restore the same session
+            claimed = f"{path}.{os.getpid()}.claimed"
+            os.rename(path, claimed)
+        except FileNotFoundError:
+            return None
+        try:
+            with open(claimed, "rb") as handoff_file:
+                record = json.load(handoff_file)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Discarding unreadable handoff for client_id {client_id}: {str(e)}")
+            return None
+        finally:
+            os.remove(claimed)
+        if record.get("client_id") != client_id or record.get("expires_at", 0) < time.time():
+            return None
+        return record.get("state")
+
+    def purge_expired(self) -> int:
+        """Remove unclaimed session files that have expired. Returns the number removed."""
+        removed = 0
+        if not os.path.isdir(self.path):
+            return removed
+        for name in os.listdir(self.path):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.path, name)
+            try:
+                if os.path.getmtime(path) + settings.HANDOFF_TTL < time.time():
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def save_audio_cache(self, entries: Dict[str, bytes]):
+        """Save synthesized feedback audio so the next worker starts with a warm cache."""
+        chunks = []
+        for key, audio in entries.items():
+            key_bytes = key.encode()
+            chunks.extend((LENGTH.pack(len(key_bytes)), key_bytes, LENGTH.pack(len(audio)), audio))
+        self._write(os.path.join(self.path, AUDIO_CACHE_FILE), b"".join(chunks))
+
+    def load_audio_cache(self) -> Dict[str, bytes]:
+        """Load audio saved by a previous worker, unless it has expired."""
+        path = os.path.join(self.path, AUDIO_CACHE_FILE)
+        try:
+            if os.path.getmtime(path) + settings.HANDOFF_TTL < time.time():
+                return {}
+            with open(path, "rb") as cache_file:
+                data = cache_file.read()
+        except OSError:
+            return {}
+
+        entries = {}
+        offset = 0
+        try:
+            while offset < len(data):
+                (key_length,) = LENGTH.unpack_from(data, offset)
+                offset += LENGTH.size
+                key = data[offset:offset + key_length].decode()
+                offset += key_length
+                (audio_length,) = LENGTH.unpack_from(data, offset)
+                offset += LENGTH.size
+                entries[key] = data[offset:offset + audio_length]
+                offset += audio_length
+        except (struct.error, UnicodeDecodeError):
+            logger.warning("Audio cache handoff is truncated, keeping the entries read so far")
+        return entries
+
+    def _session_path(self, client_id: str) -> str:
+        # Hash the id so any client_id maps to a safe, fixed-length file name
+        return os.path.join(self.path, f"{hashlib.sha256(client_id.encode()).hexdigest()}.json")
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(self.path, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
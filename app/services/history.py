@@ -0,0 +1,238 @@
+import asyncio
+import base64
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    client_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    exercise_type TEXT,
+    feedback TEXT NOT NULL,
+    audio_available INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_feedback_client_ts ON feedback (client_id, ts, id);
+"""
+
+class FeedbackHistoryStore:
+    """
+    Append-only feedback history in SQLite (WAL mode).
+
+    append() only puts the record on a bounded queue, so the frame loop never
+    waits on disk. A writer thread drains the queue and inserts records in
+    batched transactions. Queries run in worker threads on per-thread read
+    connections and page by (timestamp, id) keyset cursors, so each page is an
+    index range scan regardless of table size.
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or settings.HISTORY_DB_PATH
+        self._queue: "queue.Queue[Optional[Tuple]]" = queue.Queue(maxsize=settings.HISTORY_QUEUE_SIZE)
+        self._writer: Optional[threading.Thread] = None
+        self._readers = threading.local()
+        # Every reader connection, so close() can reach those of other threads
+        self._reader_connections: List[sqlite3.Connection] = []
+        self._reader_lock = threading.Lock()
+        self.dropped = 0
+
+    def start(self):
+        """Create the database if needed and start the writer thread."""
+        if self._writer is not None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        connection = self._connect()
+        try:
+            connection.executescript(SCHEMA)
+        finally:
+            connection.close()
+        self._writer = threading.Thread(target=self._write_loop, name="feedback-history-writer", daemon=True)
+        self._writer.start()
+        logger.info(f"Feedback history store started at {self.path}")
+
+    def close(self):
+        """Flush queued records, stop the writer thread and close the read connections."""
+        if self._writer is not None:
+            self._queue.put(None)
+            self._writer.join(timeout=settings.HISTORY_FLUSH_INTERVAL * 10)
+            self._writer = None
+        with self._reader_lock:
+            connections, self._reader_connections = self._reader_connections, []
+            # Threads that query again after this open fresh connections
+            self._readers = threading.local()
+        for connection in connections:
+            connection.close()
+
+    def append(self, client_id: str, feedback: Dict[str, Any]):
+        """
+        Queue a feedback record for writing. Never blocks.
+
+        Args:
+            client_id: Client the feedback was given to
+            feedback: Feedback data with `feedback`, `timestamp`, `exercise_type` and `audio_available`
+        """
+        timestamp = feedback.get("timestamp")
+        try:
+            ts = datetime.fromisoformat(timestamp).timestamp() if timestamp else time.time()
+        except (TypeError, ValueError):
+            ts = time.time()
+        record = (
+            client_id,
+            ts,
+            feedback.get("exercise_type"),
+            feedback.get("feedback") or "",
+            1 if feedback.get("audio_available") else 0,
+        )
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Feedback history queue full, dropped record for client_id: {client_id}")
+
+    async def query(
+        self,
+        client_id: str,
+        limit: int = 10,
+        cursor: str = None,
+        since: datetime = None,
+        until: datetime = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Fetch a page of a client's feedback, newest first.
+
+        Args:
+            client_id: Client to fetch feedback for
+            limit: Maximum number of records to return
+            cursor: Cursor returned by the previous page
+            since: Only return feedback at or after this time
+            until: Only return feedback before this time
+
+        Returns:
+            Tuple of the records and the cursor for the next page (None on the last page)
+
+        Raises:
+            ValueError: If the cursor is malformed
+        """
+        position = self._decode_cursor(cursor) if cursor else None
+        return await asyncio.to_thread(
+            self._query,
+            client_id,
+            limit,
+            position,
+            since.timestamp() if since else None,
+            until.timestamp() if until else None
+        )
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _write_loop(self):
+        connection = self._connect()
+        try:
+            running = True
+            while running:
+                record = self._queue.get()
+                if record is None:
+                    break
+                batch = [record]
+                deadline = time.monotonic() + settings.HISTORY_FLUSH_INTERVAL
+                while len(batch) < settings.HISTORY_BATCH_SIZE:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    try:
+                        record = self._queue.get(timeout=remaining)
+                    except queue.Empty:
+                        break
+                    if record is None:
+                        running = False
+                        break
+                    batch.append(record)
+                try:
+                    with connection:
+                        connection.executemany(
+                            "INSERT INTO feedback (client_id, ts, exercise_type, feedback, audio_available) "
+                            "VALUES (?, ?, ?, ?, ?)",
+                            batch
+                        )
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write {len(batch)} feedback records: {str(e)}")
+        finally:
+            connection.close()
+
+    def _reader(self) -> sqlite3.Connection:
+        readers = self._readers
+        connection = getattr(readers, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            with self._reader_lock:
+                readers.connection = connection
+                self._reader_connections.append(connection)
+        return connection
+
+    def _query(
+        self,
+        client_id: str,
+        limit: int,
+        position: Optional[Tuple[float, int]],
+        since: Optional[float],
+        until: Optional[float]
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        sql = "SELECT id, ts, exercise_type, feedback, audio_available FROM feedback WHERE client_id = ?"
+        params: list = [client_id]
+        if since is not None:
+            sql += " AND ts >= ?"
+            params.append(since)
+        if until is not None:
+            sql += " AND ts < ?"
+            params.append(until)
+        if position is not None:
+            sql += " AND (ts, id) < (?, ?)"
+            params.extend(position)
+        # Fetch one extra row to know whether another page exists
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        rows = self._reader().execute(sql, params).fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = self._encode_cursor(rows[-1][1], rows[-1][0])
+
+        items = [
+            {
+                "id": row_id,
+                "timestamp": datetime.fromtimestamp(ts).isoformat(),
+                "exercise_type": exercise_type,
+                "feedback": feedback,
+                "audio_available": bool(audio_available),
+            }
+            for row_id, ts, exercise_type, feedback, audio_available in rows
+        ]
+        return items, next_cursor
+
+    @staticmethod
+    def _encode_cursor(ts: float, row_id: int) -> str:
+        return base64.urlsafe_b64encode(f"{ts!r}:{row_id}".encode()).decode()
+
+    @staticmethod
+    def _decode_cursor(cursor: str) -> Tuple[float, int]:
+        try:
+            ts, row_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+            return float(ts), int(row_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
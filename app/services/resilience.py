@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Optional, TypeVar
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because the provider's circuit is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"Circuit open for {name}")
+        self.name = name
+
+def is_retryable(error: BaseException) -> bool:
+    """
+    Whether a failed upstream call may succeed if sent again.
+
+    HTTP errors are retryable only for 408, 429 and 5xx responses; other 4xx
+    errors (a rejected image, a bad key) fail the same way every time. Errors
+    without an HTTP status are timeouts and connection failures.
+    """
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if not isinstance(status, int):
+        return True
+    return status in (408, 429) or status >= 500
+
+async def close_result(result):
+    """Close a result that holds a connection, e.g. a response stream nobody will read."""
+    close = getattr(result, "aclose", None) or getattr(result, "close", None)
+    if close is None:
+        return
+    try:
+        closing = close()
+        if asyncio.iscoroutine(closing):
+            await closing
+    except Exception as e:
+        logger.debug(f"Failed to close discarded upstream result: {str(e)}")
+
+class LatencyTracker:
+    """Rolling window of successful call latencies used to pick the hedge deadline."""
+
+    def __init__(self, window: int = None):
+        self._samples = deque(maxlen=window or settings.HEDGE_LATENCY_WINDOW)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(q * len(ordered)))
+        return ordered[index]
+
+    def hedge_delay(self) -> float:
+        """Return how long to wait for the first attempt before sending a hedge."""
+        if len(self._samples) < settings.HEDGE_MIN_SAMPLES:
+            return settings.HEDGE_DEFAULT_DELAY
+        return max(settings.HEDGE_MIN_DELAY, self.percentile(settings.HEDGE_PERCENTILE))
+
+class HedgeBudget:
+    """
+    Token bucket that limits hedged requests to a fraction of all requests.
+
+    Every primary request deposits `ratio` tokens and every hedge spends one,
+    so extra upstream spend is bounded by the ratio even when a provider is slow.
+    """
+
+    def __init__(self, ratio: float = None, capacity: float = 10.0):
+        self.ratio = ratio if ratio is not None else settings.HEDGE_BUDGET_RATIO
+        self.capacity = capacity
+        self._tokens = 0.0
+
+    def deposit(self):
+        self._tokens = min(self.capacity, self._tokens + self.ratio)
+
+    def try_acquire(self) -> bool:
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+class CircuitBreaker:
+    """
+    Per-provider circuit breaker.
+
+    After `failure_threshold` consecutive failures the circuit opens and calls are
+    rejected immediately. Once `reset_timeout` has passed a single probe is let
+    through; its outcome closes or re-opens the circuit.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int = None, reset_timeout: float = None):
+        self.name = name
+        self.failure_threshold = failure_threshold or settings.BREAKER_FAILURE_THRESHOLD
+        self.reset_timeout = reset_timeout or settings.BREAKER_RESET_TIMEOUT
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def allow_request(self) -> bool:
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            logger.info(f"Circuit for {self.name} half-open, sending probe")
+            self.state = self.HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+        self.state = self.CLOSED
+        self._failures = 0
+        self._probe_in_flight = False
+
+    def release_probe(self):
+        """Let another probe through after one ended without an outcome, e.g. was cancelled."""
+        if self.state == self.HALF_OPEN:
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        self._failures += 1
+        if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Circuit for {self.name} opened after {self._failures} failures")
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+class UpstreamPolicy:
+    """
+    Wraps calls to an upstream provider with hedging, retries and circuit breaking.
+
+    Idempotent calls get a hedged duplicate once the first attempt passes the
+    provider's p95 latency, and are retried with full-jitter backoff on failure.
+    Every call, including retries, is bounded by `timeout`. Only retryable
+    failures (see `is_retryable`) are retried and count against the breaker;
+    client errors are raised right away, since they say nothing about the
+    provider's health.
+    """
+
+    def __init__(self, name: str, timeout: float, breaker: CircuitBreaker = None):
+        self.name = name
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(name)
+        self.latency = LatencyTracker()
+        self.hedge_budget = HedgeBudget()
+
+    async def call(self, operation: Callable[[], Awaitable[T]], idempotent: bool = True) -> T:
+        """
+        Run an upstream operation under this policy.
+
+        Args:
+            operation: Zero-argument callable returning a fresh awaitable for each attempt
+            idempotent: Whether the operation may be hedged and retried
+
+        Returns:
+            The result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the provider's circuit is open
+            Exception: A non-retryable error, or the last attempt's error if every attempt failed
+        """
+        if not self.breaker.allow_request():
+            raise CircuitOpenError(self.name)
+        # While half-open this call is the single probe; it must give the probe
+        # back however it ends, or the circuit never closes again
+        holding_probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout
+        attempts = settings.RETRY_ATTEMPTS + 1 if idempotent else 1
+        last_error: Exception = asyncio.TimeoutError(f"{self.name} call timed out")
+        self.hedge_budget.deposit()
+
+        try:
+            for attempt in range(attempts):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                started = loop.time()
+                try:
+                    awaitable = self._hedged(operation) if idempotent else operation()
+                    result = await asyncio.wait_for(awaitable, remaining)
+                except Exception as e:
+                    if not is_retryable(e):
+                        logger.warning(f"{self.name} call rejected, not retrying: {str(e)}")
+                        raise
+                    last_error = e
+                    self.breaker.record_failure()
+                    holding_probe = False
+                    logger.warning(f"{self.name} attempt {attempt + 1}/{attempts} failed: {str(e)}")
+                    if attempt + 1 >= attempts or not self.breaker.allow_request():
+                        break
+                    holding_probe = self.breaker.state == CircuitBreaker.HALF_OPEN
+                    await asyncio.sleep(min(self._backoff(attempt), max(0.0, deadline - loop.time())))
+                    continue
+
+                self.latency.record(loop.time() - started)
+                self.breaker.record_success()
+                holding_probe = False
+                return result
+        finally:
+            # Reached with the probe still held on cancellation or when the
+            # deadline passed before the probe was sent
+            if holding_probe:
+                self.breaker.release_probe()
+
+        raise last_error
+
+    async def _hedged(self, operation: Callable[[], Awaitable[T]]) -> T:
+        pending = {asyncio.ensure_future(operation())}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=self.latency.hedge_delay())
+            if not done and self.hedge_budget.try_acquire():
+                logger.info(f"{self.name} request exceeded hedge deadline, sending hedged request")
+                pending.add(asyncio.ensure_future(operation()))
+
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        # Both attempts may finish in the same step; close the loser
+                        # so a streamed response does not stay open
+                        for other in done - {task}:
+                            if other.exception() is None:
+                                await close_result(other.result())
+                        return task.result()
+                    error = task.exception()
+                    if not is_retryable(error):
+                        raise error
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        # Full jitter keeps retries from many sessions from arriving in lockstep
+        ceiling = min(settings.RETRY_MAX_DELAY, settings.RETRY_BASE_DELAY * (2 ** attempt))
+        return random.uniform(0, ceiling)
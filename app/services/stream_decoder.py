@@ -0,0 +1,249 @@
+import io
+import logging
+import queue
+import threading
+import time
+import traceback
+from typing import Callable, Optional
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+JPEG_SOI = b"\xff\xd8"
+JPEG_EOI = b"\xff\xd9"
+
+# Container formats PyAV is asked to demux for each supported stream_format
+CONTAINER_FORMATS = {
+    "webm": "webm",
+    "mp4": "mp4",
+}
+STREAM_FORMATS = ("mjpeg", *CONTAINER_FORMATS)
+
+class FrameSampler:
+    """Selects at most one frame per sampling interval of stream time."""
+
+    def __init__(self, interval: float = None):
+        self._interval = interval
+        self._last_sampled: Optional[float] = None
+
+    @property
+    def interval(self) -> float:
+        # Without a fixed interval, follow the setting so runtime changes apply to open streams
+        return self._interval if self._interval is not None else settings.VIDEO_STREAM_SAMPLE_INTERVAL
+
+    def should_sample(self, timestamp: float) -> bool:
+        if self._last_sampled is not None and timestamp - self._last_sampled < self.interval:
+            return False
+        self._last_sampled = timestamp
+        return True
+
+class MJPEGStreamDecoder:
+    """
+    Splits a Motion JPEG byte stream into frames.
+
+    Each frame already is a JPEG, which is what the vision service consumes, so
+    frames are only delimited (by their SOI/EOI markers) and never decoded.
+    Frames between samples are discarded as soon as their end marker arrives.
+    The search for a frame's end resumes where the previous chunk's search
+    stopped, so a frame split over many small messages is scanned only once.
+    """
+
+    def __init__(self, on_frame: Callable[[bytes], None]):
+        self.on_frame = on_frame
+        self.sampler = FrameSampler()
+        # Holds the current frame from its SOI marker once one was found
+        self._buffer = bytearray()
+        self._in_frame = False
+        self._scan_from = 0
+        self.error: Optional[str] = None
+
+    def start(self):
+        pass
+
+    def feed(self, data: bytes) -> bool:
+        """Split frames out of the next chunk. Oversized frames are discarded, so this never fails."""
+        self._buffer.extend(data)
+        while True:
+            if not self._in_frame:
+                start = self._buffer.find(JPEG_SOI)
+                if start < 0:
+                    # Keep a trailing 0xFF in case it begins the next marker
+                    del self._buffer[:-1]
+                    return True
+                del self._buffer[:start]
+                self._in_frame = True
+                self._scan_from = len(JPEG_SOI)
+            end = self._buffer.find(JPEG_EOI, self._scan_from)
+            if end < 0:
+                if len(self._buffer) > settings.VIDEO_STREAM_MAX_BUFFER:
+                    logger.warning("MJPEG frame exceeded buffer limit, discarding")
+                    self._buffer.clear()
+                    self._in_frame = False
+                    return True
+                # The last byte may be the first half of the end marker
+                self._scan_from = max(len(JPEG_SOI), len(self._buffer) - 1)
+                return True
+            if self.sampler.should_sample(time.monotonic()):
+                self.on_frame(bytes(self._buffer[:end + 2]))
+            del self._buffer[:end + 2]
+            self._in_frame = False
+
+    def close(self):
+        self._buffer.clear()
+        self._in_frame = False
+
+class _ChunkPipe(io.RawIOBase):
+    """
+    Blocking, non-seekable file object fed with chunks from another thread.
+
+    At most `max_bytes` may be waiting to be read; put() refuses chunks beyond that
+    instead of letting memory grow when decoding falls behind the socket.
+    """
+
+    def __init__(self, max_bytes: int):
+        self._chunks: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        self._current = memoryview(b"")
+        self._max_bytes = max_bytes
+        self._pending_bytes = 0
+        self._lock = threading.Lock()
+
+    def readable(self) -> bool:
+        return True
+
+    def put(self, data: bytes) -> bool:
+        with self._lock:
+            if self._pending_bytes + len(data) > self._max_bytes:
+                return False
+            self._pending_bytes += len(data)
+        self._chunks.put(data)
+        return True
+
+    def put_eof(self):
+        self._chunks.put(None)
+
+    def discard(self):
+        """Drop unread chunks once nothing will read them; readers still see EOF."""
+        while True:
+            try:
+                self._chunks.get_nowait()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._pending_bytes = 0
+        self._chunks.put(None)
+
+    def readinto(self, buffer) -> int:
+        while not self._current:
+            chunk = self._chunks.get()
+            if chunk is None:
+                # Leave the end marker in place so every later read also sees EOF
+                self._chunks.put(None)
+                return 0
+            with self._lock:
+                self._pending_bytes -= len(chunk)
+            self._current = memoryview(chunk)
+        size = min(len(buffer), len(self._current))
+        buffer[:size] = self._current[:size]
+        self._current = self._current[size:]
+        return size
+
+class ContainerStreamDecoder:
+    """
+    Incrementally decodes a WebM or fragmented MP4 stream in a worker thread.
+
+    Chunks received on the socket are piped into PyAV, which demuxes and decodes
+    the video track. Only frames selected by the sampler are scaled and encoded
+    to JPEG; with VIDEO_STREAM_KEYFRAMES_ONLY the decoder skips everything but
+    keyframes, which cuts decode CPU further for long GOPs.
+    """
+
+    def __init__(self, stream_format: str, on_frame: Callable[[bytes], None]):
+        self.container_format = CONTAINER_FORMATS[stream_format]
+        self.on_frame = on_frame
+        self.sampler = FrameSampler()
+        self._pipe = _ChunkPipe(settings.VIDEO_STREAM_MAX_BUFFER)
+        self._thread = threading.Thread(target=self._run, name=f"{stream_format}-decoder", daemon=True)
+        self._closed = False
+        self.error: Optional[str] = None
+
+    def start(self):
+        self._thread.start()
+
+    def feed(self, data: bytes) -> bool:
+        """
+        Queue the next chunk of the stream for decoding.
+
+        Returns:
+            bool: False if the decoder stopped (see `error`) or fell more than
+            VIDEO_STREAM_MAX_BUFFER behind; the stream cannot continue either way
+        """
+        if self._closed:
+            return False
+        if not self._pipe.put(data):
+            self.error = "Decoder fell behind the stream"
+            logger.warning(f"{self.error}, closing {self.container_format} decoder")
+            self.close()
+            return False
+        return True
+
+    def close(self):
+        if not self._closed:
+            self._closed = True
+            self._pipe.put_eof()
+
+    def _run(self):
+        try:
+            import av
+            
+            with av.open(self._pipe, format=self.container_format, mode="r") as container:
+                stream = container.streams.video[0]
+                if settings.VIDEO_STREAM_KEYFRAMES_ONLY:
+                    stream.codec_context.skip_frame = "NONKEY"
+                for frame in container.decode(stream):
+                    if self._closed:
+                        break
+                    if frame.time is None or not self.sampler.should_sample(frame.time):
+                        continue
+                    self.on_frame(self._encode(frame))
+        except Exception as e:
+            if not self._closed:
+                self.error = f"Could not decode {self.container_format} stream: {str(e)}"
+                logger.error(f"Error decoding {self.container_format} stream: {str(e)}")
+                logger.debug(f"Traceback: {traceback.format_exc()}")
+        finally:
+            # Nothing reads the pipe any more, so later chunks must be refused
+            if not self._closed:
+                self.error = self.error or f"{self.container_format} stream ended"
+                self.close()
+            self._pipe.discard()
+
+    @staticmethod
+    def _encode(frame) -> bytes:
+        width, height = frame.width, frame.height
+        if width > settings.VIDEO_STREAM_FRAME_WIDTH:
+            height = int(height * settings.VIDEO_STREAM_FRAME_WIDTH / width) // 2 * 2
+            width = settings.VIDEO_STREAM_FRAME_WIDTH
+        image = frame.reformat(width=width, height=height, format="rgb24").to_image()
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=settings.VIDEO_STREAM_JPEG_QUALITY)
+        return output.getvalue()
+
+def create_stream_decoder(stream_format: str, on_frame: Callable[[bytes], None]):
+    """
+    Create a decoder for an encoded video stream.
+
+    Args:
+        stream_format: One of STREAM_FORMATS
+        on_frame: Called with JPEG bytes for each sampled frame. Container decoders
+            call it from their worker thread.
+
+    Returns:
+        A decoder with start(), feed(bytes) -> bool, close() methods and an `error`
+        attribute explaining why feed() returned False
+    """
+    if stream_format == "mjpeg":
+        return MJPEGStreamDecoder(on_frame)
+    if stream_format in CONTAINER_FORMATS:
+        return ContainerStreamDecoder(stream_format, on_frame)
+    raise ValueError(f"Unsupported stream format: {stream_format}")
@@ -0,0 +1,60 @@
+from typing import Optional
+from app.core.config import settings
+
+# Characters that close a clause the TTS engine can speak on its own
+CLAUSE_TERMINATORS = ".!?;:,"
+SENTENCE_TERMINATORS = ".!?"
+
+class ClauseBuffer:
+    """
+    Accumulates streamed model text and releases speakable clauses.
+
+    Only the first clause is released early so synthesis can start while the
+    model is still generating; everything after it is held back and released
+    by flush() once the stream ends, which keeps it to at most two TTS calls
+    per feedback sentence.
+    """
+
+    def __init__(self, min_chars: int = None):
+        self.min_chars = min_chars if min_chars is not None else settings.STREAM_CLAUSE_MIN_CHARS
+        self._buffer = ""
+        self._released_first = False
+
+    def feed(self, delta: str) -> Optional[str]:
+        """
+        Add a text delta and return the first clause once it is complete.
+
+        Args:
+            delta: Next chunk of text from the model
+
+        Returns:
+            Optional[str]: The first complete clause, or None if not ready yet
+        """
+        self._buffer += delta
+        if self._released_first:
+            return None
+
+        end = self._find_clause_end(self._buffer)
+        if end is None:
+            return None
+
+        clause = self._buffer[:end].strip()
+        self._buffer = self._buffer[end:]
+        self._released_first = True
+        return clause
+
+    def flush(self) -> Optional[str]:
+        """Return any remaining text once the stream has finished."""
+        remainder = self._buffer.strip()
+        self._buffer = ""
+        return remainder or None
+
+    def _find_clause_end(self, text: str) -> Optional[int]:
+        # A terminator only ends a clause once it is followed by whitespace,
+        # so decimals such as "1.5" are never split
+        for i, char in enumerate(text[:-1]):
+            if char not in CLAUSE_TERMINATORS or not text[i + 1].isspace():
+                continue
+            if char in SENTENCE_TERMINATORS or i + 1 >= self.min_chars:
+                return i + 1
+        return None
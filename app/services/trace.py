@@ -0,0 +1,187 @@
+import contextvars
+import json
+import logging
+import os
+import queue
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+from app.core.config import settings
+from app.core.runtime_config import TUNABLES
+
+logger = logging.getLogger(__name__)
+
+TRACE_MAGIC = b"TRC1"
+
+# Record kinds
+FRAME_BYTES = 1  # Binary WebSocket message
+TEXT = 2  # Text WebSocket message (control message or base64 frame)
+DISCONNECT = 3  # Client disconnected
+UPSTREAM = 4  # JSON: provider, latency and result of an upstream call
+
+# kind (u8), seconds since trace start (f64), payload length (u32)
+RECORD_HEADER = struct.Struct("<BdI")
+LENGTH = struct.Struct("<I")
+
+_current_trace: contextvars.ContextVar[Optional["TraceRecorder"]] = contextvars.ContextVar("current_trace", default=None)
+
+class TraceRecorder:
+    """
+    Writes a compact, length-prefixed trace of one WebSocket session.
+
+    A trace file is TRACE_MAGIC, a length-prefixed JSON header (route, client,
+    connection parameters and tunable settings), then records of RECORD_HEADER
+    followed by the payload. Frames are stored as received, without re-encoding.
+    record() only timestamps the record and puts it on a bounded queue; a writer
+    thread does all file I/O, so recording never blocks the event loop.
+    """
+
+    def __init__(self, path: str, header: Dict[str, Any]):
+        self.path = path
+        self.dropped = 0
+        self._started = time.monotonic()
+        self._closed = False
+        self._queue: "queue.Queue[Optional[Tuple[bytes, bytes]]]" = queue.Queue(maxsize=settings.TRACE_QUEUE_SIZE)
+        header_bytes = json.dumps(header).encode()
+        self._queue.put_nowait((TRACE_MAGIC + LENGTH.pack(len(header_bytes)), header_bytes))
+        self._writer = threading.Thread(target=self._write_loop, name="trace-writer")
+        self._writer.start()
+
+    def record(self, kind: int, payload: bytes = b""):
+        if self._closed:
+            return
+        record_header = RECORD_HEADER.pack(kind, time.monotonic() - self._started, len(payload))
+        try:
+            self._queue.put_nowait((record_header, payload))
+        except queue.Full:
+            self.dropped += 1
+
+    def record_message(self, message: dict):
+        message_type = message.get("type")
+        if message_type == "websocket.disconnect":
+            self.record(DISCONNECT)
+        elif message.get("bytes") is not None:
+            self.record(FRAME_BYTES, message["bytes"])
+        elif message.get("text") is not None:
+            self.record(TEXT, message["text"].encode())
+
+    def close(self):
+        """Stop recording; the writer thread flushes what is queued and closes the file."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(None)
+
+    def _write_loop(self):
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            with open(self.path, "wb", buffering=settings.TRACE_BUFFER_SIZE) as trace_file:
+                while True:
+                    item = self._queue.get()
+                    if item is None:
+                        break
+                    trace_file.write(item[0])
+                    trace_file.write(item[1])
+        except OSError as e:
+            logger.error(f"Failed to write session trace {self.path}: {str(e)}")
+            return
+        if self.dropped:
+            logger.warning(f"Session trace {self.path} is incomplete, dropped {self.dropped} records")
+        logger.info(f"Saved session trace to {self.path}")
+
+class _RecordingWebSocket:
+    """Proxy around a WebSocket that records every received message."""
+
+    def __init__(self, websocket, recorder: TraceRecorder):
+        self._websocket = websocket
+        self._recorder = recorder
+
+    async def receive(self) -> dict:
+        message = await self._websocket.receive()
+        self._recorder.record_message(message)
+        return message
+
+    def __getattr__(self, name):
+        return getattr(self._websocket, name)
+
+@contextmanager
+def record_session(websocket, route: str, client_id: str, params: Dict[str, Any], enabled: bool):
+    """
+    Record a WebSocket session to TRACE_DIR if requested and allowed.
+
+    Yields the socket the route handler should use: the original one, or a
+    recording proxy. Upstream calls made while handling the session are added
+    to the same trace through record_upstream().
+
+    Args:
+        websocket: The client's WebSocket connection
+        route: Name of the route handling the session
+        client_id: Unique identifier for the client
+        params: Connection parameters needed to replay the session, with defaults resolved
+        enabled: Whether the client asked for the session to be recorded
+    """
+    if not (enabled and settings.TRACE_RECORDING_ENABLED):
+        yield websocket
+        return
+
+    safe_client_id = re.sub(r"[^A-Za-z0-9_.-]", "_", client_id)
+    path = os.path.join(settings.TRACE_DIR, f"{safe_client_id}-{datetime.now():%Y%m%d-%H%M%S-%f}.trace")
+    recorder = TraceRecorder(path, {
+        "route": route,
+        "client_id": client_id,
+        "params": params,
+        # Replays apply the tunables in effect here, not the replaying machine's
+        "settings": {name: getattr(settings, name) for name in TUNABLES},
+        "recorded_at": datetime.now().isoformat(),
+    })
+    token = _current_trace.set(recorder)
+    logger.info(f"Recording session trace for client {client_id} to {path}")
+    try:
+        yield _RecordingWebSocket(websocket, recorder)
+    finally:
+        _current_trace.reset(token)
+        recorder.close()
+
+def record_upstream(provider: str, latency: float, **result):
+    """
+    Add an upstream call to the current session's trace, if it is being recorded.
+
+    Args:
+        provider: Upstream call name, e.g. "vision", "vision_stream" or "tts"
+        latency: Seconds the call took
+        result: JSON-serializable details needed to replay the call
+    """
+    recorder = _current_trace.get()
+    if recorder is not None:
+        recorder.record(UPSTREAM, json.dumps({"provider": provider, "latency": latency, **result}).encode())
+
+def read_trace(path: str) -> Tuple[Dict[str, Any], Iterator[Tuple[int, float, bytes]]]:
+    """
+    Read a trace file.
+
+    Returns:
+        Tuple of the header and an iterator of (kind, seconds since start, payload) records
+
+    Raises:
+        ValueError: If the file is not a trace
+    """
+    trace_file = open(path, "rb")
+    if trace_file.read(len(TRACE_MAGIC)) != TRACE_MAGIC:
+        trace_file.close()
+        raise ValueError(f"{path} is not a session trace")
+    (header_length,) = LENGTH.unpack(trace_file.read(LENGTH.size))
+    header = json.loads(trace_file.read(header_length))
+
+    def records() -> Iterator[Tuple[int, float, bytes]]:
+        with trace_file:
+            while True:
+                record_header = trace_file.read(RECORD_HEADER.size)
+                if len(record_header) < RECORD_HEADER.size:
+                    return
+                kind, offset, length = RECORD_HEADER.unpack(record_header)
+                yield kind, offset, trace_file.read(length)
+
+    return header, records()
@@ -0,0 +1,344 @@
+import asyncio
+import logging
+import multiprocessing
+import os
+import traceback
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.job import VideoJob
+from app.services.vision import VisionService
+
+logger = logging.getLogger(__name__)
+
+def probe_video(video_path: str) -> Tuple[float, int]:
+    """Return the frame rate and frame count of a video file."""
+    import cv2
+    
+    capture = cv2.VideoCapture(video_path)
+    try:
+        if not capture.isOpened():
+            raise ValueError("Unsupported or corrupt video file")
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+        frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        return fps, frame_count
+    finally:
+        capture.release()
+
+def extract_keyframes(
+    video_path: str,
+    start_frame: int,
+    end_frame: int,
+    step: int,
+    fps: float,
+    max_width: int,
+    jpeg_quality: int,
+    min_frame_diff: float
+) -> List[Tuple[float, bytes]]:
+    """
+    Extract sampled keyframes from one segment of a video.
+
+    Runs in a worker process. Every `step`-th frame is decoded and compared with
+    the previously selected frame; near-duplicates (mean absolute difference of a
+    small grayscale thumbnail below `min_frame_diff`) are skipped so static parts
+    of a set do not cost an upstream call.
+
+    Returns:
+        List of (timestamp in seconds, JPEG bytes) tuples in frame order
+    """
+    import cv2
+    import numpy as np
+    
+    capture = cv2.VideoCapture(video_path)
+    keyframes = []
+    previous_thumb = None
+    try:
+        capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+        for frame_index in range(start_frame, end_frame):
+            if (frame_index - start_frame) % step:
+                # grab() advances without converting the frame
+                if not capture.grab():
+                    break
+                continue
+
+            ok, frame = capture.read()
+            if not ok:
+                break
+
+            thumb = cv2.resize(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (32, 32), interpolation=cv2.INTER_AREA)
+            if previous_thumb is not None:
+                difference = float(np.mean(cv2.absdiff(thumb, previous_thumb)))
+                if difference < min_frame_diff:
+                    continue
+            previous_thumb = thumb
+
+            height, width = frame.shape[:2]
+            if width > max_width:
+                frame = cv2.resize(frame, (max_width, int(height * max_width / width)), interpolation=cv2.INTER_AREA)
+            ok, buffer = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, jpeg_quality])
+            if ok:
+                keyframes.append((frame_index / fps, buffer.tobytes()))
+    finally:
+        capture.release()
+    return keyframes
+
+class VideoUpload:
+    """
+    A job's video being written to VIDEO_JOB_DIR as it is received.
+
+    Data is buffered up to VIDEO_JOB_UPLOAD_CHUNK_SIZE and written from a worker
+    thread, so the event loop never blocks on the disk.
+    """
+
+    def __init__(self, filename: str):
+        self.job_id = uuid.uuid4().hex
+        self.filename = filename
+        extension = os.path.splitext(filename or "")[1] or ".mp4"
+        self.path = os.path.join(settings.VIDEO_JOB_DIR, f"{self.job_id}{extension}")
+        self.size = 0
+        self._file = None
+        self._buffer = bytearray()
+
+    async def open(self):
+        self._file = await asyncio.to_thread(open, self.path, "wb")
+
+    async def write(self, data: bytes):
+        self.size += len(data)
+        self._buffer.extend(data)
+        if len(self._buffer) >= settings.VIDEO_JOB_UPLOAD_CHUNK_SIZE:
+            await asyncio.to_thread(self._file.write, self._buffer)
+            self._buffer.clear()
+
+    async def close(self):
+        if self._buffer:
+            await asyncio.to_thread(self._file.write, self._buffer)
+            self._buffer.clear()
+        await asyncio.to_thread(self._file.close)
+
+    async def discard(self):
+        """Close and delete a partial upload."""
+        self._buffer.clear()
+        await asyncio.to_thread(self._remove)
+
+    def _remove(self):
+        if self._file is not None:
+            self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+class VideoJobService:
+    """
+    Runs offline analysis jobs for uploaded videos.
+
+    The video is split into segments that are decoded in parallel by a process
+    pool. Keyframes are analyzed as soon as their segment is done, with a
+    semaphore shared by all jobs bounding concurrent vision requests. Keyframes
+    wait for analysis in a bounded queue and only VIDEO_JOB_SEGMENTS_AHEAD
+    segments are decoded ahead of it, so memory stays flat however long the video.
+    """
+
+    def __init__(self, vision_service: VisionService):
+        self.vision_service = vision_service
+        self.jobs: Dict[str, VideoJob] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._analysis_semaphore = asyncio.Semaphore(settings.VIDEO_JOB_ANALYSIS_CONCURRENCY)
+        self._tasks = set()
+        os.makedirs(settings.VIDEO_JOB_DIR, exist_ok=True)
+
+    def apply_settings(self, changed: dict):
+        """Apply runtime configuration changes."""
+        if "VIDEO_JOB_ANALYSIS_CONCURRENCY" in changed:
+            # Requests already holding the old semaphore finish on it; new ones use the new limit
+            self._analysis_semaphore = asyncio.Semaphore(changed["VIDEO_JOB_ANALYSIS_CONCURRENCY"])
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # The server is multi-threaded by now (history writer, to_thread pool,
+            # decoder threads); forking it could copy a lock held by another thread
+            self._executor = ProcessPoolExecutor(
+                max_workers=settings.VIDEO_JOB_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def open_upload(self, filename: str) -> VideoUpload:
+        """
+        Open the file a new job's video is uploaded into.
+
+        Args:
+            filename: Original file name, used for the stored file's extension
+
+        Returns:
+            VideoUpload: The upload, to be passed to `create_job` once complete
+        """
+        upload = VideoUpload(filename)
+        await upload.open()
+        return upload
+
+    async def create_job(self, upload: VideoUpload, exercise_type: str = None) -> VideoJob:
+        """
+        Start processing a completely received upload in the background.
+
+        Args:
+            upload: Upload opened with `open_upload`
+            exercise_type: Optional type of exercise being performed
+
+        Returns:
+            VideoJob: The queued job
+        """
+        await upload.close()
+        self._prune_finished_jobs()
+        job = VideoJob(upload.job_id, upload.filename, upload.path, exercise_type)
+        self.jobs[job.job_id] = job
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        logger.info(f"Created video job {job.job_id} for {upload.filename} ({upload.size} bytes)")
+        return job
+
+    def get_job(self, job_id: str) -> Optional[VideoJob]:
+        return self.jobs.get(job_id)
+
+    def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run(self, job: VideoJob):
+        loop = asyncio.get_running_loop()
+        job.status = VideoJob.PROCESSING
+        job.notify()
+        try:
+            fps, frame_count = await loop.run_in_executor(self.executor, probe_video, job.video_path)
+            if frame_count <= 0:
+                raise ValueError("Could not determine the number of frames in the video")
+            job.duration_seconds = round(frame_count / fps, 2) if fps else None
+            step = max(1, round(fps * settings.VIDEO_JOB_SAMPLE_INTERVAL))
+            # Segment boundaries are multiples of the sampling step so every worker samples the same grid
+            segment_frames = max(step, round(fps * settings.VIDEO_JOB_SEGMENT_SECONDS / step) * step)
+            segments = [
+                (start, min(start + segment_frames, frame_count))
+                for start in range(0, frame_count, segment_frames)
+            ]
+            job.segments_total = len(segments)
+            logger.info(f"Video job {job.job_id}: {frame_count} frames at {fps:.1f} fps in {len(segments)} segments")
+
+            keyframes: asyncio.Queue = asyncio.Queue(maxsize=settings.VIDEO_JOB_KEYFRAME_QUEUE_SIZE)
+            analyzers = [
+                asyncio.create_task(self._analyze_keyframes(job, keyframes))
+                for _ in range(settings.VIDEO_JOB_ANALYSIS_CONCURRENCY)
+            ]
+            try:
+                await self._extract_segments(job, segments, step, fps, keyframes)
+                for _ in analyzers:
+                    await keyframes.put(None)
+                await asyncio.gather(*analyzers)
+            finally:
+                for analyzer in analyzers:
+                    analyzer.cancel()
+
+            job.status = VideoJob.COMPLETED
+            logger.info(f"Video job {job.job_id} completed with {len(job.results)} results")
+        except Exception as e:
+            logger.error(f"Video job {job.job_id} failed: {str(e)}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            job.status = VideoJob.FAILED
+            job.error = str(e)
+        finally:
+            job.finished_at = datetime.now()
+            job.notify()
+            try:
+                os.remove(job.video_path)
+            except OSError:
+                pass
+
+    async def _extract_segments(
+        self,
+        job: VideoJob,
+        segments: List[Tuple[int, int]],
+        step: int,
+        fps: float,
+        keyframes: asyncio.Queue
+    ):
+        """Decode segments in the process pool and queue their keyframes, a bounded number of segments ahead."""
+        loop = asyncio.get_running_loop()
+        share = 1 / len(segments)
+        pending = set()
+
+        async def queue_next_done():
+            nonlocal pending
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for extraction in done:
+                frames = extraction.result()
+                job.segments_done += 1
+                job.frames_extracted += len(frames)
+                job.work_done += share / 2 if frames else share
+                job.notify()
+                for timestamp, frame in frames:
+                    # Blocks while analysis is behind, which holds back new segments
+                    await keyframes.put((timestamp, frame, share / 2 / len(frames)))
+
+        try:
+            for start, end in segments:
+                pending.add(loop.run_in_executor(
+                    self.executor,
+                    extract_keyframes,
+                    job.video_path,
+                    start,
+                    end,
+                    step,
+                    fps,
+                    settings.VIDEO_JOB_FRAME_WIDTH,
+                    settings.VIDEO_JOB_JPEG_QUALITY,
+                    settings.VIDEO_JOB_MIN_FRAME_DIFF
+                ))
+                if len(pending) >= settings.VIDEO_JOB_SEGMENTS_AHEAD:
+                    await queue_next_done()
+            while pending:
+                await queue_next_done()
+        finally:
+            for extraction in pending:
+                extraction.cancel()
+
+    async def _analyze_keyframes(self, job: VideoJob, keyframes: asyncio.Queue):
+        while True:
+            item = await keyframes.get()
+            if item is None:
+                return
+            timestamp, frame, share = item
+            try:
+                await self._analyze_keyframe(job, timestamp, frame)
+            except Exception as e:
+                logger.error(f"Video job {job.job_id}: failed to analyze keyframe at {timestamp:.2f}s: {str(e)}")
+            job.work_done += share
+            job.notify()
+
+    async def _analyze_keyframe(self, job: VideoJob, timestamp: float, frame: bytes):
+        async with self._analysis_semaphore:
+            feedback = await self.vision_service.analyze_frame(
+                frame,
+                exercise_type=job.exercise_type,
+                fallback=False
+            )
+        job.frames_analyzed += 1
+        if feedback:
+            job.results.append({
+                "timestamp": round(timestamp, 2),
+                "feedback": feedback
+            })
+
+    def _prune_finished_jobs(self):
+        cutoff = datetime.now() - timedelta(seconds=settings.VIDEO_JOB_RETENTION)
+        expired = [
+            job_id for job_id, job in self.jobs.items()
+            if job.is_finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self.jobs[job_id]
@@ -1,27 +1,72 @@
+import asyncio
 import base64
-import cv2
-import numpy as np
-from openai import OpenAI
 from app.core.config import settings
+from app.services.frame_cache import FrameResultCache
+from app.services.resilience import UpstreamPolicy
+from app.services.trace import record_upstream
+import itertools
 import logging
+import time
 import traceback
-import io
-from PIL import Image
-from typing import Optional
+from typing import TYPE_CHECKING, AsyncGenerator, List, Optional
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI, OpenAI
 
 logger = logging.getLogger(__name__)
 
+class FallbackFeedback(str):
+    """A generic coaching phrase standing in for feedback while the vision provider is unavailable."""
+
 class VisionService:
     def __init__(self):
         try:
-            self.client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            # OpenAI clients are created on first use or by warm_up(), so importing
+            # and constructing this service stays cheap
+            self._client: Optional["OpenAI"] = None
+            self._async_client: Optional["AsyncOpenAI"] = None
+            self.policy = UpstreamPolicy("openai", timeout=settings.VISION_TIMEOUT)
+            # Stream opens share the breaker but track time-to-first-byte separately
+            self.stream_policy = UpstreamPolicy(
+                "openai-stream",
+                timeout=settings.VISION_TIMEOUT,
+                breaker=self.policy.breaker
+            )
+            self._fallback_phrases = itertools.cycle(settings.VISION_FALLBACK_PHRASES or [None])
+            self.result_cache = FrameResultCache() if settings.FRAME_CACHE_ENABLED else None
             self.feedback_history = {}  # Dict to store feedback history per user
             self.max_history_length = 3  # Keep last 3 feedback messages for context
-            logger.info("OpenAI client initialized successfully")
+            logger.info("Vision service initialized")
         except Exception as e:
-            logger.error(f"Failed to initialize OpenAI client: {str(e)}")
+            logger.error(f"Failed to initialize vision service: {str(e)}")
             raise
 
+    @property
+    def client(self) -> "OpenAI":
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=settings.OPENAI_API_KEY)
+            logger.info("OpenAI client initialized successfully")
+        return self._client
+
+    @property
+    def async_client(self) -> "AsyncOpenAI":
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            # Retries and timeouts are handled by the upstream policies
+            self._async_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                max_retries=0,
+                timeout=settings.VISION_TIMEOUT
+            )
+            logger.info("Async OpenAI client initialized successfully")
+        return self._async_client
+
+    async def warm_up(self):
+        """Import and create the OpenAI clients off the event loop, then open a pooled connection."""
+        await asyncio.to_thread(lambda: (self.client, self.async_client))
+        await self.async_client.models.list()
+
     def _add_to_history(self, user_id: str, feedback: str):
         """Add feedback to user's history."""
         if user_id not in self.feedback_history:
@@ -32,6 +77,26 @@ class VisionService:
         if len(self.feedback_history[user_id]) > self.max_history_length:
             self.feedback_history[user_id] = self.feedback_history[user_id][-self.max_history_length:]
 
+    def apply_settings(self, changed: dict):
+        """Apply runtime configuration changes to the frame result cache."""
+        if self.result_cache is None:
+            return
+        if {"FRAME_CACHE_SIZE", "FRAME_CACHE_TTL", "FRAME_CACHE_MAX_DISTANCE"} & changed.keys():
+            self.result_cache.configure(
+                max_entries=changed.get("FRAME_CACHE_SIZE"),
+                ttl=changed.get("FRAME_CACHE_TTL"),
+                max_distance=changed.get("FRAME_CACHE_MAX_DISTANCE")
+            )
+
+    def get_history(self, user_id: str) -> List[str]:
+        """Return the feedback context kept for a user."""
+        return list(self.feedback_history.get(user_id, []))
+
+    def restore_history(self, user_id: str, history: List[str]):
+        """Restore a user's feedback context, e.g. from a session handed off by another worker."""
+        if history:
+            self.feedback_history[user_id] = list(history)[-self.max_history_length:]
+
     def _get_history_context(self, user_id: str) -> str:
         """Get formatted history context for the prompt."""
         if user_id not in self.feedback_history or not self.feedback_history[user_id]:
@@ -43,7 +108,58 @@ class VisionService:
             context += f"{i}. {msg}\n"
         return context
 
-    async def analyze_frame(self, frame_data: bytes, exercise_type: str = None, user_id: str = None) -> Optional[str]:
+    def _build_messages(self, frame_data: bytes, exercise_type: str = None, user_id: str = None) -> list:
+        """Build the chat messages for a frame, including the coaching prompt and history context."""
+        # Convert bytes to base64 for OpenAI API
+        png_base64 = base64.b64encode(frame_data).decode('utf-8')
+        
+        # Prepare prompt based on exercise type and history
+        prompt = "You are a personal trainer. Give quick, direct feedback in 1 short sentence max. (this is a MUST rule)"
+        if exercise_type:
+            prompt += f" Exercise: {exercise_type}."
+        prompt += " Focus only on the most critical form correction needed right now. be concise and to the point. Be also very motivating, you need to motivate the user to workout correctly."
+        
+        # Add history context if available
+        if user_id:
+            history_context = self._get_history_context(user_id)
+            if history_context:
+                prompt += f"\n{history_context}\nBased on this history, provide new feedback that builds upon previous corrections:"
+                
+        prompt += "Be also very motivating, you need to motivate the user to workout correctly."
+        
+        return [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": prompt},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/png;base64,{png_base64}"
+                        }
+                    }
+                ]
+            }
+        ]
+
+    async def _get_cached(self, frame_data: bytes, exercise_type: str = None):
+        """Return cached feedback for a repeated frame and the frame's perceptual hash."""
+        if self.result_cache is None:
+            return None, None
+        return await self.result_cache.get(frame_data, exercise_type)
+
+    def fallback_feedback(self) -> Optional[FallbackFeedback]:
+        """Return a generic coaching phrase to use when the vision provider is unavailable."""
+        phrase = next(self._fallback_phrases)
+        return FallbackFeedback(phrase) if phrase else None
+
+    async def analyze_frame(
+        self,
+        frame_data: bytes,
+        exercise_type: str = None,
+        user_id: str = None,
+        fallback: bool = True
+    ) -> Optional[str]:
         """
         Analyze a frame and return feedback text using GPT-4o-mini vision model.
         
@@ -51,67 +167,146 @@ class VisionService:
             frame_data: Raw bytes of the image
             exercise_type: Optional type of exercise being performed
             user_id: Optional user ID for tracking feedback history
+            fallback: Whether to return a generic coaching phrase if analysis fails
             
         Returns:
-            Optional[str]: Feedback text or None if analysis fails
+            Optional[str]: Feedback text, a `FallbackFeedback` phrase if analysis fails, or
+            None if analysis fails and fallback is disabled
         """
         try:
-            logger.info("Starting frame analysis with GPT-4o-mini")
-            
-            # Convert bytes to base64 for OpenAI API
-            png_base64 = base64.b64encode(frame_data).decode('utf-8')
-            
-            # Prepare prompt based on exercise type and history
-            prompt = "You are a personal trainer. Give quick, direct feedback in 1 short sentence max. (this is a MUST rule)"
-            if exercise_type:
-                prompt += f" Exercise: {exercise_type}."
-            prompt += " Focus only on the most critical form correction needed right now. be concise and to the point. Be also very motivating, you need to motivate the user to workout correctly."
-            
-            # Add history context if available
-            if user_id:
-                history_context = self._get_history_context(user_id)
-                if history_context:
-                    prompt += f"\n{history_context}\nBased on this history, provide new feedback that builds upon previous corrections:"
-                    
-            prompt += "Be also very motivating, you need to motivate the user to workout correctly."
+            cached, frame_hash = await self._get_cached(frame_data, exercise_type)
+            if cached:
+                logger.info(f"Returning cached feedback for repeated frame: {cached}")
+                record_upstream("vision", 0.0, feedback=cached, cached=True)
+                return cached
             
+            logger.info("Starting frame analysis with GPT-4o-mini")
+            messages = self._build_messages(frame_data, exercise_type, user_id)
             logger.info(f"Sending request to GPT-4o-mini with exercise_type: {exercise_type}")
             
-            # Call GPT-4o-mini
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/png;base64,{png_base64}"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=100
-            )
+            # Call GPT-4o-mini (hedged and retried, the request has no side effects)
+            started = time.monotonic()
+            try:
+                response = await self.policy.call(
+                    lambda: self.async_client.chat.completions.create(
+                        model=settings.VISION_MODEL,
+                        messages=messages,
+                        max_tokens=settings.VISION_MAX_TOKENS
+                    )
+                )
+            except Exception as e:
+                record_upstream("vision", time.monotonic() - started, error=str(e))
+                raise
             
             feedback = response.choices[0].message.content
+            record_upstream("vision", time.monotonic() - started, feedback=feedback)
             logger.info(f"Received response from GPT-4o-mini Vision: {feedback}")
             
             # Store feedback in history if user_id is provided
             if user_id:
                 self._add_to_history(user_id, feedback)
             
+            if self.result_cache is not None:
+                self.result_cache.put(frame_data, frame_hash, exercise_type, feedback)
+            
             return feedback
             
         except Exception as e:
             logger.error(f"Error analyzing frame: {str(e)}")
             logger.error(f"Traceback: {traceback.format_exc()}")
-            return None
+            return self.fallback_feedback() if fallback else None
+
+    async def analyze_frame_stream(
+        self,
+        frame_data: bytes,
+        exercise_type: str = None,
+        user_id: str = None
+    ) -> AsyncGenerator[str, None]:
+        """
+        Analyze a frame and yield feedback text deltas as the model produces them.
+        
+        Args:
+            frame_data: Raw bytes of the image
+            exercise_type: Optional type of exercise being performed
+            user_id: Optional user ID for tracking feedback history
+            
+        Yields:
+            str: Text deltas of the feedback, in order. If the request fails before any
+            text arrives, a single `FallbackFeedback` phrase is yielded instead.
+        """
+        parts = []
+        started = None
+        first_delta = None
+        try:
+            cached, frame_hash = await self._get_cached(frame_data, exercise_type)
+            if cached:
+                logger.info(f"Returning cached feedback for repeated frame: {cached}")
+                record_upstream("vision_stream", 0.0, first_delta=0.0, feedback=cached, cached=True)
+                yield cached
+                return
+            
+            logger.info("Starting streaming frame analysis with GPT-4o-mini")
+            messages = self._build_messages(frame_data, exercise_type, user_id)
+            logger.info(f"Sending streaming request to GPT-4o-mini with exercise_type: {exercise_type}")
+            
+            # Opening the stream can be hedged and retried; once tokens are
+            # flowing they have been forwarded to the client, so no retries after that
+            started = time.monotonic()
+            stream = await self.stream_policy.call(
+                lambda: self.async_client.chat.completions.create(
+                    model=settings.VISION_MODEL,
+                    messages=messages,
+                    max_tokens=settings.VISION_MAX_TOKENS,
+                    stream=True
+                )
+            )
+            
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    if first_delta is None:
+                        first_delta = time.monotonic() - started
+                    parts.append(delta)
+                    yield delta
+            
+            feedback = "".join(parts)
+            record_upstream(
+                "vision_stream",
+                time.monotonic() - started,
+                first_delta=first_delta,
+                feedback=feedback
+            )
+            logger.info(f"Received streamed response from GPT-4o-mini Vision: {feedback}")
+            
+            # Store feedback in history if user_id is provided
+            if user_id and feedback:
+                self._add_to_history(user_id, feedback)
+            
+            if self.result_cache is not None:
+                self.result_cache.put(frame_data, frame_hash, exercise_type, feedback)
+                
+        except Exception as e:
+            logger.error(f"Error streaming frame analysis: {str(e)}")
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            if started is not None:
+                record_upstream(
+                    "vision_stream",
+                    time.monotonic() - started,
+                    first_delta=first_delta,
+                    feedback="".join(parts),
+                    error=str(e)
+                )
+            if not parts:
+                fallback = self.fallback_feedback()
+                if fallback:
+                    yield fallback
 
     async def analyze_frame_base64(self, frame_base64: str, exercise_type: str = None) -> str:
+        import cv2
+        import numpy as np
+        
         try:
             logger.info("Starting frame analysis")
             # Decode base64 image
@@ -138,7 +333,7 @@ class VisionService:
             logger.info(f"Sending request to GPT-4o-mini with exercise_type: {exercise_type}")
             # Call GPT-4o-mini
             response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Updated to the latest model version
+                model=settings.VISION_MODEL,
                 messages=[
                     {
                         "role": "user",
@@ -153,7 +348,7 @@ class VisionService:
                         ]
                     }
                 ],
-                max_tokens=100
+                max_tokens=settings.VISION_MAX_TOKENS
             )
             
             feedback = response.choices[0].message.content
@@ -0,0 +1 @@
+"""Developer tools for debugging and profiling the service."""
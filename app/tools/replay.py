@@ -0,0 +1,271 @@
+"""
+Replay a recorded session trace against the real handlers with stubbed upstreams.
+
+The recorded client messages are fed to the WebSocket route at their original
+pace (scaled by --speed), and OpenAI and ElevenLabs are replaced by stubs that
+return the recorded results after the recorded latencies. Nothing leaves the
+process, so a production session can be reproduced and profiled locally:
+
+    python -m app.tools.replay data/traces/<trace> --speed 2 --profile replay.prof
+"""
+import argparse
+import asyncio
+import cProfile
+import json
+import logging
+import pstats
+import statistics
+import time
+from collections import defaultdict, deque
+from types import SimpleNamespace
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.runtime_config import TUNABLES
+from app.services.trace import DISCONNECT, FRAME_BYTES, TEXT, UPSTREAM, read_trace
+
+logger = logging.getLogger(__name__)
+
+# Outbound messages that are not a response to a frame
+_CONTROL_REPLIES = {"pong", "audio_format", "error", "rate_limited"}
+
+class UpstreamScript:
+    """Recorded upstream results, handed out in call order per provider."""
+
+    def __init__(self, speed: float):
+        self.speed = speed
+        self._results: Dict[str, Deque[Dict[str, Any]]] = defaultdict(deque)
+        self._last: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, result: Dict[str, Any]):
+        self._results[result["provider"]].append(result)
+
+    def next(self, provider: str) -> Dict[str, Any]:
+        # Calls the recording did not make (e.g. a colder audio cache) reuse the last result
+        results = self._results[provider]
+        if results:
+            self._last[provider] = results.popleft()
+        return self._last.get(provider, {"provider": provider, "latency": 0.0})
+
+    def delay(self, seconds: Optional[float]) -> float:
+        return (seconds or 0.0) / self.speed if self.speed > 0 else 0.0
+
+class _StubCompletions:
+    def __init__(self, script: UpstreamScript):
+        self.script = script
+
+    async def create(self, stream: bool = False, **kwargs):
+        if stream:
+            result = self.script.next("vision_stream")
+            first_delta = result.get("first_delta") or 0.0
+            await asyncio.sleep(self.script.delay(first_delta))
+            return self._stream(result, first_delta)
+
+        result = self.script.next("vision")
+        await asyncio.sleep(self.script.delay(result.get("latency")))
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        message = SimpleNamespace(content=result.get("feedback"))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    async def _stream(self, result: Dict[str, Any], first_delta: float):
+        words = (result.get("feedback") or "").split(" ")
+        pause = self.script.delay(max(0.0, result.get("latency", 0.0) - first_delta) / max(1, len(words)))
+        for index, word in enumerate(words):
+            if index:
+                await asyncio.sleep(pause)
+            delta = SimpleNamespace(content=word if index == 0 else f" {word}")
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=delta)])
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+
+class StubOpenAI:
+    """Stands in for AsyncOpenAI, answering with recorded vision results."""
+
+    def __init__(self, script: UpstreamScript):
+        self.chat = SimpleNamespace(completions=_StubCompletions(script))
+
+class _StubTextToSpeech:
+    def __init__(self, script: UpstreamScript):
+        self.script = script
+
+    def convert(self, text: str, **kwargs):
+        # Called from a worker thread, like the real client
+        result = self.script.next("tts")
+        time.sleep(self.script.delay(result.get("latency")))
+        if result.get("error"):
+            raise RuntimeError(result["error"])
+        return iter([b"\0" * result.get("size", 0)])
+
+class StubElevenLabs:
+    """Stands in for the ElevenLabs client, returning silence of the recorded size."""
+
+    def __init__(self, script: UpstreamScript):
+        self.text_to_speech = _StubTextToSpeech(script)
+
+class ReplayWebSocket:
+    """
+    Feeds recorded client messages to a handler and timestamps its replies.
+
+    Each frame's latency runs from the moment it is delivered to the first
+    reply sent after it; frames superseded before any reply count as unanswered.
+    """
+
+    def __init__(self, messages: List[tuple], speed: float):
+        self.messages = deque(messages)
+        self.speed = speed
+        self.latencies: List[float] = []
+        self.frames = 0
+        self.replies = 0
+        self.close_code: Optional[int] = None
+        self._started: float = None
+        self._pending_frame: Optional[float] = None
+
+    async def accept(self):
+        self._started = time.monotonic()
+
+    async def receive(self) -> dict:
+        if not self.messages:
+            return {"type": "websocket.disconnect", "code": 1000}
+        kind, offset, payload = self.messages.popleft()
+        if self.speed > 0:
+            await asyncio.sleep(max(0.0, self._started + offset / self.speed - time.monotonic()))
+        if kind == DISCONNECT:
+            self.messages.clear()
+            return {"type": "websocket.disconnect", "code": 1000}
+        if kind == FRAME_BYTES:
+            self._frame_delivered()
+            return {"type": "websocket.receive", "bytes": payload}
+        text = payload.decode()
+        if not self._is_control(text):
+            self._frame_delivered()
+        return {"type": "websocket.receive", "text": text}
+
+    async def send_text(self, data: str):
+        try:
+            reply_type = json.loads(data).get("type")
+        except (ValueError, AttributeError):
+            reply_type = None
+        if reply_type not in _CONTROL_REPLIES:
+            self._reply_sent()
+
+    async def send_bytes(self, data: bytes):
+        self._reply_sent()
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.close_code = code
+
+    def _frame_delivered(self):
+        self.frames += 1
+        self._pending_frame = time.monotonic()
+
+    def _reply_sent(self):
+        self.replies += 1
+        if self._pending_frame is not None:
+            self.latencies.append(time.monotonic() - self._pending_frame)
+            self._pending_frame = None
+
+    @staticmethod
+    def _is_control(text: str) -> bool:
+        try:
+            return isinstance(json.loads(text), dict)
+        except ValueError:
+            return False
+
+async def replay(path: str, speed: float = 1.0) -> dict:
+    """
+    Replay a trace and measure the service's behaviour.
+
+    Args:
+        path: Trace file written by a recorded session
+        speed: Playback speed; 2 replays twice as fast, 0 as fast as possible
+
+    Returns:
+        dict: Frame latency percentiles, CPU time and message counts
+    """
+    from app.api.routes.websocket import WebSocketRouter
+    from app.managers.audio import AudioFeedbackManager
+    from app.managers.connection import ConnectionManager
+    from app.services.vision import VisionService
+
+    header, records = read_trace(path)
+    script = UpstreamScript(speed)
+    messages = []
+    for kind, offset, payload in records:
+        if kind == UPSTREAM:
+            script.add(json.loads(payload))
+        elif kind in (FRAME_BYTES, TEXT, DISCONNECT):
+            messages.append((kind, offset, payload))
+
+    # Run with the tunables that were in effect when the session was recorded
+    for name, value in header.get("settings", {}).items():
+        if name in TUNABLES:
+            setattr(settings, name, value)
+    # One stub call per recorded call: no hedges or retries on top of the recording
+    settings.HEDGE_BUDGET_RATIO = 0.0
+    settings.RETRY_ATTEMPTS = 0
+    # The per-session rate limit runs on wall time, so it is scaled with the replay
+    settings.RATE_LIMIT_INTERVAL = settings.RATE_LIMIT_INTERVAL / speed if speed > 0 else 0.0
+    # Cache hits are part of the recording; live caches would skip or add calls and
+    # hand the recorded results out of order
+    settings.FRAME_CACHE_ENABLED = False
+
+    vision_service = VisionService()
+    vision_service._async_client = StubOpenAI(script)
+    connection_manager = ConnectionManager(AudioFeedbackManager(StubElevenLabs(script), use_cache=False))
+    router = WebSocketRouter(connection_manager, vision_service)
+    websocket = ReplayWebSocket(messages, speed)
+
+    route = header["route"]
+    params = header.get("params", {})
+    started = time.monotonic()
+    cpu_started = time.process_time()
+    if route == "exercise-analysis":
+        await router.handle_exercise_analysis(websocket, header["client_id"], **params)
+    elif route == "video-stream":
+        await router.handle_video_stream(websocket, header["client_id"], **params)
+    else:
+        raise ValueError(f"Unknown route in trace: {route}")
+
+    latencies = sorted(websocket.latencies)
+    return {
+        "route": route,
+        "params": params,
+        "wall_seconds": round(time.monotonic() - started, 3),
+        "cpu_seconds": round(time.process_time() - cpu_started, 3),
+        "frames": websocket.frames,
+        "replies": websocket.replies,
+        "unanswered_frames": websocket.frames - len(latencies),
+        "latency_ms": {
+            name: round(_percentile(latencies, q) * 1000, 1) if latencies else None
+            for name, q in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99))
+        },
+        "mean_latency_ms": round(statistics.fmean(latencies) * 1000, 1) if latencies else None,
+    }
+
+def _percentile(values: List[float], q: float) -> float:
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session trace with stubbed upstreams")
+    parser.add_argument("trace", help="Path to a .trace file")
+    parser.add_argument("--speed", type=float, default=1.0, help="Playback speed, 0 for as fast as possible")
+    parser.add_argument("--profile", help="Write cProfile stats to this file and print the top functions")
+    parser.add_argument("--verbose", action="store_true", help="Show the service's own logs")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING)
+
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    report = asyncio.run(replay(args.trace, args.speed))
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+        pstats.Stats(profiler).sort_stats("cumulative").print_stats(20)
+
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
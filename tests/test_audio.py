@@ -0,0 +1,117 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.managers.audio import AdaptiveAudioFormat, AudioFeedbackManager
+
+class FakeElevenLabs:
+    """Returns the requested text and format as the audio, or fails while `down`."""
+
+    def __init__(self):
+        self.down = False
+        self.calls = []
+        self.text_to_speech = SimpleNamespace(convert=self.convert)
+
+    def convert(self, text, voice_id, model_id, output_format):
+        self.calls.append((text, output_format))
+        if self.down:
+            raise ConnectionError("provider down")
+        return iter([f"{text}@{output_format}".encode()])
+
+@pytest.fixture(autouse=True)
+def audio_settings(monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_FORMATS", {
+        "opus": ["opus_48000_32"],
+        "mp3": ["mp3_22050_32"],
+        "pcm": ["pcm_16000", "pcm_8000"],
+    })
+    monkeypatch.setattr(settings, "DEFAULT_AUDIO_FORMAT", "mp3")
+    monkeypatch.setattr(settings, "AUDIO_STEP_DOWN_SEND_TIME", 0.25)
+    monkeypatch.setattr(settings, "AUDIO_STEP_UP_SEND_TIME", 0.05)
+    monkeypatch.setattr(settings, "AUDIO_STEP_UP_AFTER", 3)
+    monkeypatch.setattr(settings, "RETRY_ATTEMPTS", 0)
+    monkeypatch.setattr(settings, "HEDGE_BUDGET_RATIO", 0.0)
+
+def test_warm_up_banks_phrases_in_every_format():
+    client = FakeElevenLabs()
+    manager = AudioFeedbackManager(eleven_client=client)
+    phrases = ["Keep going", "Nice form"]
+
+    async def scenario():
+        await manager.warm_up(phrases)
+        client.down = True
+        return {
+            output_format: [await manager.generate_feedback(phrase, output_format) for phrase in phrases]
+            for output_format in ("opus_48000_32", "mp3_22050_32", "pcm_16000", "pcm_8000")
+        }
+
+    audio = asyncio.run(scenario())
+    for output_format, clips in audio.items():
+        assert clips == [f"{phrase}@{output_format}".encode() for phrase in phrases]
+    assert len(client.calls) == 2 * 4
+
+def test_negotiate_picks_the_first_supported_family():
+    audio_format = AdaptiveAudioFormat()
+    assert audio_format.output_format == "mp3_22050_32"
+
+    assert audio_format.negotiate(["flac", " PCM ", "opus"])
+    assert audio_format.family == "pcm"
+    assert audio_format.output_format == "pcm_16000"
+
+def test_negotiate_without_a_supported_family_keeps_the_format():
+    audio_format = AdaptiveAudioFormat("opus")
+    assert not audio_format.negotiate(["flac", "aac"])
+    assert audio_format.output_format == "opus_48000_32"
+
+def test_slow_send_steps_down_to_the_bottom_rung_only():
+    audio_format = AdaptiveAudioFormat("pcm")
+    assert audio_format.record_send(0.3)
+    assert audio_format.output_format == "pcm_8000"
+    assert not audio_format.record_send(0.3)
+    assert audio_format.output_format == "pcm_8000"
+
+def test_single_rung_family_never_changes():
+    audio_format = AdaptiveAudioFormat("mp3")
+    assert not audio_format.record_send(1.0)
+    assert not any(audio_format.record_send(0.01) for _ in range(10))
+    assert audio_format.output_format == "mp3_22050_32"
+
+def test_run_of_fast_sends_steps_back_up():
+    audio_format = AdaptiveAudioFormat("pcm")
+    audio_format.record_send(0.3)
+
+    assert not audio_format.record_send(0.01)
+    assert not audio_format.record_send(0.01)
+    assert audio_format.record_send(0.01)
+    assert audio_format.output_format == "pcm_16000"
+
+def test_moderate_or_slow_send_resets_the_fast_run():
+    audio_format = AdaptiveAudioFormat("pcm")
+    audio_format.record_send(0.3)
+
+    # Two fast sends, then one between the thresholds starts the count over
+    for seconds in (0.01, 0.01, 0.1, 0.01, 0.01):
+        assert not audio_format.record_send(seconds)
+    assert audio_format.output_format == "pcm_8000"
+    assert audio_format.record_send(0.01)
+    assert audio_format.output_format == "pcm_16000"
+
+def test_negotiate_resets_the_rung_and_fast_run():
+    audio_format = AdaptiveAudioFormat("pcm")
+    audio_format.record_send(0.3)
+    audio_format.record_send(0.01)
+
+    assert audio_format.negotiate(["pcm"])
+    assert audio_format.output_format == "pcm_16000"
+    audio_format.record_send(0.3)
+    assert not audio_format.record_send(0.01)
+    assert not audio_format.record_send(0.01)
+
+def test_restore_clamps_the_rung_and_ignores_unknown_families():
+    audio_format = AdaptiveAudioFormat()
+    audio_format.restore("pcm", 7)
+    assert audio_format.output_format == "pcm_8000"
+    audio_format.restore("flac", 0)
+    assert audio_format.output_format == "pcm_8000"
@@ -0,0 +1,177 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("fastapi")
+
+from app.core.config import settings
+from app.managers.broadcast import BroadcastHub, Subscriber
+from app.managers.drain import SERVICE_RESTART, DrainManager
+
+class FakeWebSocket:
+    """Records what is sent; sends block while `gate` is cleared, like a slow viewer."""
+
+    def __init__(self, headers: dict = None):
+        self.headers = headers or {}
+        self.sent = []
+        self.accepted = False
+        self.closed_with = None
+        self.gate = asyncio.Event()
+        self.gate.set()
+
+    async def accept(self):
+        self.accepted = True
+
+    async def send_text(self, data: str):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def send_bytes(self, data: bytes):
+        await self.gate.wait()
+        self.sent.append(data)
+
+    async def close(self, code: int = 1000, reason: str = None):
+        self.closed_with = code
+
+    async def receive(self):
+        # The viewer stays connected until the server closes the socket
+        while self.closed_with is None:
+            await asyncio.sleep(0.001)
+        return {"type": "websocket.disconnect"}
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+def run_slow_viewer(drop_policy: str, messages: int = 5, max_queue: int = 2):
+    """Publish while the viewer's first send is stuck, then let it catch up."""
+
+    async def scenario():
+        websocket = FakeWebSocket()
+        subscriber = Subscriber(websocket, "client-1", max_queue=max_queue, drop_policy=drop_policy)
+        subscriber.start()
+        websocket.gate.clear()
+        subscriber.offer(("text", "m0"))
+        await settle()
+        for index in range(1, messages):
+            subscriber.offer(("text", f"m{index}"))
+        websocket.gate.set()
+        await settle()
+        subscriber.close()
+        await settle()
+        return websocket, subscriber
+
+    return asyncio.run(scenario())
+
+def test_drop_oldest_keeps_the_latest_messages():
+    websocket, subscriber = run_slow_viewer(Subscriber.DROP_OLDEST)
+    assert websocket.sent == ["m0", "m3", "m4"]
+    assert subscriber.dropped == 2
+    assert websocket.closed_with is None
+
+def test_drop_newest_keeps_the_queued_messages():
+    websocket, subscriber = run_slow_viewer(Subscriber.DROP_NEWEST)
+    assert websocket.sent == ["m0", "m1", "m2"]
+    assert subscriber.dropped == 2
+    assert websocket.closed_with is None
+
+def test_disconnect_policy_closes_a_slow_viewer():
+    websocket, subscriber = run_slow_viewer(Subscriber.DISCONNECT)
+    assert subscriber.closed
+    assert websocket.closed_with == 1008
+    assert "m3" not in websocket.sent
+
+def test_disconnect_policy_leaves_a_viewer_that_keeps_up_open():
+    websocket, subscriber = run_slow_viewer(Subscriber.DISCONNECT, messages=3)
+    assert websocket.sent == ["m0", "m1", "m2"]
+    assert websocket.closed_with is None
+
+def test_each_message_is_serialized_once_for_all_viewers():
+    async def scenario():
+        hub = BroadcastHub()
+        sockets = [FakeWebSocket() for _ in range(3)]
+        for websocket in sockets:
+            hub.subscribe(websocket, "client-1")
+        hub.publish_text("client-1", {"type": "feedback", "feedback": "Knees out"})
+        hub.publish_text("client-2", {"type": "feedback", "feedback": "not watched"})
+        await settle()
+        return sockets
+
+    sockets = asyncio.run(scenario())
+    assert all(websocket.sent == sockets[0].sent for websocket in sockets)
+    assert all(websocket.sent[0] is sockets[0].sent[0] for websocket in sockets)
+    assert json.loads(sockets[0].sent[0])["feedback"] == "Knees out"
+
+def test_drain_sends_viewers_a_reconnect_hint():
+    class NoHandoff:
+        def save(self, client_id, state):
+            pass
+
+    async def scenario():
+        hub = BroadcastHub()
+        manager = SimpleNamespace(
+            user_sessions={},
+            active_connections={},
+            broadcast_hub=hub,
+            audio_manager=None
+        )
+        drain_manager = DrainManager(manager, vision_service=None, handoff_store=NoHandoff())
+        websocket = FakeWebSocket()
+        hub.subscribe(websocket, "client-1")
+        hub.publish_text("client-1", "queued feedback")
+        await settle()
+        await drain_manager.drain()
+        return websocket
+
+    websocket = asyncio.run(scenario())
+    assert websocket.sent[0] == "queued feedback"
+    assert json.loads(websocket.sent[-1])["type"] == "reconnect"
+    assert websocket.closed_with == SERVICE_RESTART
+
+@pytest.fixture
+def router(monkeypatch):
+    from app.api.routes.websocket import WebSocketRouter
+
+    monkeypatch.setattr(settings, "WATCH_TOKEN", "viewer-secret")
+    manager = SimpleNamespace(broadcast_hub=BroadcastHub())
+    return WebSocketRouter(manager, vision_service=None)
+
+@pytest.mark.parametrize("token, headers", [
+    (None, {}),
+    ("wrong", {}),
+    ("viewer-sécret", {}),
+    (None, {"x-watch-token": "wrong"}),
+])
+def test_watch_without_a_valid_token_is_refused(router, token, headers):
+    websocket = FakeWebSocket(headers)
+    asyncio.run(router.handle_watch(websocket, "client-1", token))
+    assert not websocket.accepted
+    assert websocket.closed_with == 1008
+    assert router.manager.broadcast_hub.subscriber_count("client-1") == 0
+
+def test_watch_is_disabled_without_a_configured_token(router, monkeypatch):
+    monkeypatch.setattr(settings, "WATCH_TOKEN", None)
+    websocket = FakeWebSocket()
+    asyncio.run(router.handle_watch(websocket, "client-1", "viewer-secret"))
+    assert not websocket.accepted
+
+@pytest.mark.parametrize("token, headers", [
+    ("viewer-secret", {}),
+    (None, {"x-watch-token": "viewer-secret"}),
+])
+def test_watch_with_the_token_subscribes(router, token, headers):
+    websocket = FakeWebSocket(headers)
+
+    async def scenario():
+        watch = asyncio.create_task(router.handle_watch(websocket, "client-1", token))
+        await settle()
+        count = router.manager.broadcast_hub.subscriber_count("client-1")
+        await websocket.close()
+        await watch
+        return count
+
+    assert asyncio.run(scenario()) == 1
+    assert websocket.accepted
+    assert json.loads(websocket.sent[0])["type"] == "subscribed"
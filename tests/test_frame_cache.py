@@ -0,0 +1,126 @@
+import asyncio
+import io
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import frame_cache
+from app.services.frame_cache import FrameResultCache, perceptual_hash
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(frame_cache, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+@pytest.fixture
+def hashes(monkeypatch):
+    """Frames are b"frame-<hash>", so tests choose the perceptual hash of each frame."""
+    threads = []
+
+    def fake_hash(frame_data: bytes):
+        threads.append(threading.current_thread())
+        return int(frame_data.split(b"-")[1])
+
+    monkeypatch.setattr(frame_cache, "perceptual_hash", fake_hash)
+    return threads
+
+def frame(frame_hash: int) -> bytes:
+    return b"frame-%d" % frame_hash
+
+def get(cache: FrameResultCache, frame_data: bytes, exercise_type: str = "squat"):
+    return asyncio.run(cache.get(frame_data, exercise_type))
+
+def store(cache: FrameResultCache, frame_data: bytes, feedback: str, exercise_type: str = "squat"):
+    _, frame_hash = get(cache, frame_data, exercise_type)
+    cache.put(frame_data, frame_hash, exercise_type, feedback)
+
+def test_identical_frame_hits_by_digest_without_hashing(clock, hashes):
+    cache = FrameResultCache(max_entries=8, ttl=30, max_distance=4)
+    store(cache, frame(0b1010), "Keep your back straight")
+    hashed = len(hashes)
+
+    assert get(cache, frame(0b1010)) == ("Keep your back straight", None)
+    assert len(hashes) == hashed
+
+def test_similar_frame_hits_within_hamming_distance(clock, hashes):
+    cache = FrameResultCache(max_entries=8, ttl=30, max_distance=2)
+    store(cache, frame(0b0000), "Knees out")
+
+    # Different bytes, hash two bits away
+    feedback, frame_hash = get(cache, b"other-" + frame(0b0011)[6:])
+    assert feedback == "Knees out"
+    assert frame_hash == 0b0011
+
+def test_frame_beyond_hamming_distance_misses(clock, hashes):
+    cache = FrameResultCache(max_entries=8, ttl=30, max_distance=2)
+    store(cache, frame(0b0000), "Knees out")
+
+    assert get(cache, frame(0b0111)) == (None, 0b0111)
+    assert cache.misses == 2
+
+def test_similar_frame_of_another_exercise_misses(clock, hashes):
+    cache = FrameResultCache(max_entries=8, ttl=30, max_distance=2)
+    store(cache, frame(0b0000), "Knees out", exercise_type="squat")
+
+    assert get(cache, frame(0b0001), "lunge") == (None, 0b0001)
+
+def test_entries_expire_after_ttl(clock, hashes):
+    cache = FrameResultCache(max_entries=8, ttl=30, max_distance=2)
+    store(cache, frame(0b0000), "Knees out")
+
+    clock.now += 29
+    assert get(cache, frame(0b0000))[0] == "Knees out"
+    clock.now += 2
+    assert get(cache, frame(0b0000))[0] is None
+    assert get(cache, frame(0b0001))[0] is None
+
+def test_least_recently_used_entry_is_evicted(clock, hashes):
+    cache = FrameResultCache(max_entries=2, ttl=30, max_distance=0)
+    store(cache, frame(1), "one")
+    store(cache, frame(2), "two")
+    assert get(cache, frame(1))[0] == "one"
+
+    store(cache, frame(4), "four")
+    assert get(cache, frame(1))[0] == "one"
+    assert get(cache, frame(2))[0] is None
+    assert get(cache, frame(4))[0] == "four"
+
+def test_configure_shrinks_the_cache(clock, hashes):
+    cache = FrameResultCache(max_entries=4, ttl=30, max_distance=0)
+    for frame_hash in (1, 2, 4, 8):
+        store(cache, frame(frame_hash), str(frame_hash))
+
+    cache.configure(max_entries=2)
+    assert [get(cache, frame(frame_hash))[0] for frame_hash in (1, 2, 4, 8)] == [None, None, "4", "8"]
+
+def test_frames_are_hashed_off_the_event_loop(clock, hashes):
+    cache = FrameResultCache(max_entries=8, ttl=30, max_distance=2)
+    get(cache, frame(1))
+    assert hashes and all(thread is not threading.main_thread() for thread in hashes)
+
+def test_reencoded_frame_has_a_nearby_hash():
+    Image = pytest.importorskip("PIL.Image")
+    image = Image.new("RGB", (320, 240))
+    for x in range(320):
+        for y in range(0, 240, 8):
+            image.putpixel((x, y), (x % 256, y, 128))
+
+    encoded = []
+    for quality in (95, 60):
+        buffer = io.BytesIO()
+        image.save(buffer, "JPEG", quality=quality)
+        encoded.append(buffer.getvalue())
+
+    first, second = (perceptual_hash(data) for data in encoded)
+    assert encoded[0] != encoded[1]
+    assert (first ^ second).bit_count() <= 4
+    assert perceptual_hash(b"not an image") is None
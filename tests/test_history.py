@@ -0,0 +1,134 @@
+import asyncio
+import sqlite3
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services.history import FeedbackHistoryStore
+
+START = datetime(2026, 1, 5, 9, 0, 0)
+
+@pytest.fixture
+def store(tmp_path):
+    store = FeedbackHistoryStore(str(tmp_path / "history.db"))
+    store.start()
+    yield store
+    store.close()
+
+def record(minute: int, text: str, exercise_type: str = "squat") -> dict:
+    return {
+        "timestamp": (START + timedelta(minutes=minute)).isoformat(),
+        "feedback": text,
+        "exercise_type": exercise_type,
+        "audio_available": True,
+    }
+
+def fill(store: FeedbackHistoryStore, records):
+    for client_id, feedback in records:
+        store.append(client_id, feedback)
+    # close() flushes the writer; queries afterwards open fresh read connections
+    store.close()
+    store.start()
+
+def query(store: FeedbackHistoryStore, client_id: str, **kwargs):
+    return asyncio.run(store.query(client_id, **kwargs))
+
+def all_pages(store: FeedbackHistoryStore, client_id: str, limit: int, **kwargs):
+    items, cursor, pages = [], None, 0
+    while True:
+        page, cursor = query(store, client_id, limit=limit, cursor=cursor, **kwargs)
+        items.extend(page)
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+def test_close_flushes_queued_records(tmp_path, monkeypatch):
+    # A long flush interval would hold the batch open without the flush on close
+    monkeypatch.setattr(settings, "HISTORY_FLUSH_INTERVAL", 5.0)
+    path = str(tmp_path / "history.db")
+    store = FeedbackHistoryStore(path)
+    store.start()
+    for minute in range(3):
+        store.append("client-1", record(minute, f"tip {minute}"))
+    store.close()
+
+    connection = sqlite3.connect(path)
+    try:
+        assert connection.execute("SELECT COUNT(*) FROM feedback").fetchone() == (3,)
+    finally:
+        connection.close()
+
+def test_cursor_pages_have_no_duplicates_or_gaps_on_equal_timestamps(store):
+    # Seven records share one timestamp, so pages must split ties by id
+    records = [("client-1", record(0, f"tie {index}")) for index in range(7)]
+    records += [("client-1", record(minute, f"tip {minute}")) for minute in range(1, 4)]
+    records += [("client-2", record(0, "other client"))]
+    fill(store, records)
+
+    items, pages = all_pages(store, "client-1", limit=3)
+    assert pages == 4
+    ids = [item["id"] for item in items]
+    assert len(ids) == len(set(ids)) == 10
+    assert sorted(item["feedback"] for item in items) == sorted(feedback["feedback"] for client, feedback in records if client == "client-1")
+    assert [(item["timestamp"], item["id"]) for item in items] == sorted(
+        ((item["timestamp"], item["id"]) for item in items), reverse=True
+    )
+
+def test_last_full_page_has_no_next_cursor(store):
+    fill(store, [("client-1", record(minute, f"tip {minute}")) for minute in range(4)])
+
+    page, cursor = query(store, "client-1", limit=4)
+    assert len(page) == 4
+    assert cursor is None
+
+def test_since_and_until_bound_the_time_range(store):
+    fill(store, [("client-1", record(minute, f"tip {minute}")) for minute in range(10)])
+
+    items, _ = all_pages(
+        store,
+        "client-1",
+        limit=2,
+        since=START + timedelta(minutes=3),
+        until=START + timedelta(minutes=7)
+    )
+    # since is inclusive, until exclusive
+    assert [item["feedback"] for item in items] == ["tip 6", "tip 5", "tip 4", "tip 3"]
+
+@pytest.mark.parametrize("cursor", ["not-a-cursor", "bm90OmFfY3Vyc29y", "!!!"])
+def test_invalid_cursor_is_rejected(store, cursor):
+    with pytest.raises(ValueError):
+        query(store, "client-1", cursor=cursor)
+
+def test_invalid_cursor_is_a_bad_request(store):
+    pytest.importorskip("fastapi")
+    import httpx
+    from fastapi import FastAPI
+    from app.api.routes.users import UserRouter
+
+    app = FastAPI()
+    app.include_router(UserRouter(SimpleNamespace(history_store=store)).router)
+
+    async def get(url: str):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.get(url)
+
+    response = asyncio.run(get("/users/client-1/feedback?cursor=not-a-cursor"))
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_close_closes_read_connections_of_every_thread(store):
+    fill(store, [("client-1", record(0, "tip"))])
+    # Each asyncio.run has its own worker threads, and each thread its own connection
+    query(store, "client-1")
+    query(store, "client-1")
+    connections = list(store._reader_connections)
+    assert len(connections) >= 2
+
+    store.close()
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+    assert query(store, "client-1")[0][0]["feedback"] == "tip"
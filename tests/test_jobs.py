@@ -0,0 +1,255 @@
+import asyncio
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("multipart")
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from app.api.routes.jobs import JobRouter
+from app.api.uploads import iter_multipart
+from app.core.config import settings
+from app.models.job import VideoJob
+from app.services import video_jobs
+from app.services.video_jobs import VideoJobService
+
+BOUNDARY = "testboundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+def multipart_body(video: bytes, exercise_type: bytes = b"squat", filename: str = "set.mp4") -> bytes:
+    return (
+        f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"exercise_type\"\r\n\r\n".encode()
+        + exercise_type
+        + f"\r\n--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"{filename}\"\r\n"
+          f"Content-Type: video/mp4\r\n\r\n".encode()
+        + video
+        + f"\r\n--{BOUNDARY}--\r\n".encode()
+    )
+
+class ChunkedRequest:
+    """The parts of a Starlette request that iter_multipart reads."""
+
+    def __init__(self, body: bytes, chunk_size: int = 100, content_type: str = CONTENT_TYPE):
+        self.headers = {"content-type": content_type}
+        self.body = body
+        self.chunk_size = chunk_size
+        self.bytes_read = 0
+
+    async def stream(self):
+        for offset in range(0, len(self.body), self.chunk_size):
+            chunk = self.body[offset:offset + self.chunk_size]
+            self.bytes_read += len(chunk)
+            yield chunk
+
+def parse(request: ChunkedRequest, max_file_size: int = 10_000, max_field_size: int = 64):
+    async def collect():
+        parts = {}
+        async for part, data in iter_multipart(request, max_file_size, max_field_size):
+            parts.setdefault(part.name, [part.filename, b""])[1] += data
+        return parts
+
+    return asyncio.run(collect())
+
+class RecordingJobService(VideoJobService):
+    """Stores uploads like the real service but does not process them."""
+
+    async def _run(self, job: VideoJob):
+        pass
+
+@pytest.fixture
+def job_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_JOB_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "VIDEO_JOB_UPLOAD_CHUNK_SIZE", 256)
+    return tmp_path
+
+@pytest.fixture
+def job_service(job_dir):
+    return RecordingJobService(vision_service=None)
+
+@pytest.fixture
+def app(job_service):
+    app = FastAPI()
+    app.include_router(JobRouter(job_service).router)
+    return app
+
+def post_job(app: FastAPI, content) -> httpx.Response:
+    async def send():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return await http.post("/jobs", content=content, headers={"content-type": CONTENT_TYPE})
+
+    return asyncio.run(send())
+
+def test_iter_multipart_yields_fields_and_files():
+    video = os.urandom(3000)
+    parts = parse(ChunkedRequest(multipart_body(video), chunk_size=97))
+    assert parts == {"exercise_type": [None, b"squat"], "file": ["set.mp4", video]}
+
+def test_iter_multipart_rejects_an_oversized_file_as_it_arrives():
+    request = ChunkedRequest(multipart_body(os.urandom(100_000)), chunk_size=500)
+    with pytest.raises(HTTPException) as error:
+        parse(request, max_file_size=1000)
+    assert error.value.status_code == 413
+    assert request.bytes_read < 2000
+
+def test_iter_multipart_rejects_an_oversized_field():
+    with pytest.raises(HTTPException) as error:
+        parse(ChunkedRequest(multipart_body(b"video", exercise_type=b"x" * 65)))
+    assert error.value.status_code == 413
+
+@pytest.mark.parametrize("body, content_type", [
+    (multipart_body(b"video")[:-20], CONTENT_TYPE),
+    (b"not multipart at all", CONTENT_TYPE),
+    (multipart_body(b"video"), "application/json"),
+])
+def test_iter_multipart_rejects_bad_bodies(body, content_type):
+    with pytest.raises(HTTPException) as error:
+        parse(ChunkedRequest(body, content_type=content_type))
+    assert error.value.status_code == 400
+
+def test_upload_is_written_to_the_job_file(app, job_service, job_dir):
+    video = os.urandom(5000)
+    response = post_job(app, multipart_body(video, filename="set.mov"))
+
+    assert response.status_code == 202
+    job = job_service.get_job(response.json()["job_id"])
+    assert job.exercise_type == "squat"
+    assert job.video_path.endswith(".mov")
+    with open(job.video_path, "rb") as video_file:
+        assert video_file.read() == video
+
+def test_oversized_upload_is_rejected_and_discarded(app, job_dir, monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_JOB_MAX_UPLOAD_BYTES", 1000)
+    body = multipart_body(os.urandom(10_000))
+
+    async def chunks():
+        # No Content-Length, so the limit is only seen while streaming
+        for offset in range(0, len(body), 512):
+            yield body[offset:offset + 512]
+
+    response = post_job(app, chunks())
+    assert response.status_code == 413
+    assert os.listdir(job_dir) == []
+
+def test_declared_oversized_upload_is_rejected_before_reading(app, job_dir, monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_JOB_MAX_UPLOAD_BYTES", 1000)
+    response = post_job(app, multipart_body(os.urandom(10_000)))
+    assert response.status_code == 413
+    assert os.listdir(job_dir) == []
+
+def test_upload_without_a_file_is_rejected(app, job_dir):
+    body = f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"exercise_type\"\r\n\r\nsquat\r\n--{BOUNDARY}--\r\n"
+    response = post_job(app, body.encode())
+    assert response.status_code == 400
+
+def test_results_are_streamed_as_ndjson_until_the_job_finishes(app, job_service):
+    job = VideoJob("job-1", "set.mp4", "/nonexistent.mp4")
+    job.status = VideoJob.PROCESSING
+    job.results.append({"timestamp": 1.0, "feedback": "Chest up"})
+    job_service.jobs[job.job_id] = job
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            request = asyncio.create_task(http.get("/jobs/job-1/results"))
+            await asyncio.sleep(0.05)
+            job.results.append({"timestamp": 2.0, "feedback": "Knees out"})
+            job.notify()
+            await asyncio.sleep(0.05)
+            job.status = VideoJob.COMPLETED
+            job.notify()
+            return await request
+
+    response = asyncio.run(scenario())
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["type"] for line in lines] == ["result", "result", "status"]
+    assert [line.get("feedback") for line in lines[:2]] == ["Chest up", "Knees out"]
+    assert lines[-1]["status"] == VideoJob.COMPLETED
+
+class SlowVision:
+    def __init__(self):
+        self.calls = 0
+
+    async def analyze_frame(self, frame, exercise_type=None, fallback=True):
+        self.calls += 1
+        await asyncio.sleep(0.001)
+        return f"feedback for {frame.decode()}"
+
+class ThreadedJobService(VideoJobService):
+    """Runs extraction in threads so the test can replace the decoding functions."""
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=4)
+        return self._executor
+
+def test_job_keeps_a_bounded_number_of_keyframes_in_memory(job_dir, monkeypatch):
+    frames_per_segment = 10
+    segments = 40
+    monkeypatch.setattr(settings, "VIDEO_JOB_SAMPLE_INTERVAL", 1.0)
+    monkeypatch.setattr(settings, "VIDEO_JOB_SEGMENT_SECONDS", float(frames_per_segment))
+    monkeypatch.setattr(settings, "VIDEO_JOB_SEGMENTS_AHEAD", 2)
+    monkeypatch.setattr(settings, "VIDEO_JOB_KEYFRAME_QUEUE_SIZE", 5)
+    monkeypatch.setattr(settings, "VIDEO_JOB_ANALYSIS_CONCURRENCY", 2)
+    monkeypatch.setattr(video_jobs, "probe_video", lambda path: (1.0, frames_per_segment * segments))
+    extracting = []
+    lock = threading.Lock()
+
+    def fake_extract(path, start, end, step, fps, *args):
+        with lock:
+            extracting.append(start)
+        return [(float(index), b"frame %d" % index) for index in range(start, end, step)]
+
+    monkeypatch.setattr(video_jobs, "extract_keyframes", fake_extract)
+    vision = SlowVision()
+    service = ThreadedJobService(vision)
+    job = VideoJob("job-1", "set.mp4", str(job_dir / "set.mp4"))
+    in_flight = []
+    progress = []
+
+    async def scenario():
+        run = asyncio.create_task(service._run(job))
+        while not run.done():
+            in_flight.append(job.frames_extracted - job.frames_analyzed)
+            progress.append(job.progress)
+            await asyncio.sleep(0)
+        await run
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        service.shutdown()
+
+    assert job.status == VideoJob.COMPLETED, job.error
+    assert len(job.results) == vision.calls == frames_per_segment * segments
+    assert sorted(extracting) == list(range(0, frames_per_segment * segments, frames_per_segment))
+    # Queue, analyzers and the segments decoded ahead bound the frames held at once
+    bound = 5 + 2 + (2 + 1) * frames_per_segment
+    assert max(in_flight) <= bound
+    assert progress == sorted(progress)
+    assert job.progress == 1.0
+
+def test_progress_never_goes_backwards():
+    job = VideoJob("job-1", "set.mp4", "/nonexistent.mp4")
+    job.segments_total = 2
+    observed = [job.progress]
+    for work in (0.25, 0.125, 0.125, 0.5):
+        job.work_done += work
+        observed.append(job.progress)
+    assert observed == sorted(observed)
+    assert observed[-1] == 1.0
+
+def test_worker_processes_are_spawned_not_forked(job_dir):
+    service = VideoJobService(vision_service=None)
+    try:
+        assert service.executor._mp_context.get_start_method() == "spawn"
+    finally:
+        service.shutdown()
@@ -0,0 +1,221 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.services import resilience
+from app.services.resilience import (
+    CircuitBreaker,
+    CircuitOpenError,
+    HedgeBudget,
+    UpstreamPolicy,
+    is_retryable,
+)
+
+class StatusError(Exception):
+    def __init__(self, status_code: int):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+class Closable:
+    def __init__(self, name: str):
+        self.name = name
+        self.closed = False
+
+    async def close(self):
+        self.closed = True
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(settings, "RETRY_ATTEMPTS", 2)
+    monkeypatch.setattr(settings, "RETRY_BASE_DELAY", 0.0)
+    monkeypatch.setattr(settings, "RETRY_MAX_DELAY", 0.0)
+    monkeypatch.setattr(settings, "HEDGE_BUDGET_RATIO", 0.0)
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(resilience.time, "monotonic", clock)
+    return clock
+
+def open_breaker(breaker: CircuitBreaker):
+    for _ in range(breaker.failure_threshold):
+        assert breaker.allow_request()
+        breaker.record_failure()
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    open_breaker(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_half_open_lets_a_single_probe_through(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow_request()
+
+def test_failed_probe_reopens_the_circuit(clock):
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=30)
+    open_breaker(breaker)
+    clock.now += 30
+
+    assert breaker.allow_request()
+    breaker.record_failure()
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow_request()
+
+def test_cancelled_probe_is_released(clock):
+    policy = UpstreamPolicy("test", timeout=5, breaker=CircuitBreaker("test", failure_threshold=1, reset_timeout=30))
+    open_breaker(policy.breaker)
+    clock.now += 30
+
+    async def scenario():
+        probe = asyncio.create_task(policy.call(lambda: asyncio.sleep(3600), idempotent=False))
+        await asyncio.sleep(0)
+        assert not policy.breaker.allow_request()
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+
+    asyncio.run(scenario())
+    assert policy.breaker.state == CircuitBreaker.HALF_OPEN
+    assert policy.breaker.allow_request()
+
+def test_open_circuit_rejects_calls_without_calling_upstream(clock):
+    policy = UpstreamPolicy("test", timeout=5, breaker=CircuitBreaker("test", failure_threshold=1, reset_timeout=30))
+    open_breaker(policy.breaker)
+    calls = []
+
+    async def operation():
+        calls.append(1)
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(policy.call(operation))
+    assert calls == []
+
+def test_hedge_budget_limits_hedges_to_the_ratio():
+    budget = HedgeBudget(ratio=0.5, capacity=2.0)
+    budget.deposit()
+    assert not budget.try_acquire()
+    budget.deposit()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+    for _ in range(10):
+        budget.deposit()
+    assert budget.try_acquire()
+    assert budget.try_acquire()
+    assert not budget.try_acquire()
+
+def test_slow_call_is_hedged_within_budget(monkeypatch):
+    monkeypatch.setattr(settings, "HEDGE_DEFAULT_DELAY", 0.01)
+    policy = UpstreamPolicy("test", timeout=5)
+    policy.hedge_budget = HedgeBudget(ratio=1.0)
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        if len(attempts) == 1:
+            await asyncio.sleep(3600)
+        return "hedge"
+
+    assert asyncio.run(policy.call(operation)) == "hedge"
+    assert len(attempts) == 2
+
+def test_hedge_is_not_sent_without_budget(monkeypatch):
+    monkeypatch.setattr(settings, "HEDGE_DEFAULT_DELAY", 0.01)
+    policy = UpstreamPolicy("test", timeout=5)
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        await asyncio.sleep(0.05)
+        return "primary"
+
+    assert asyncio.run(policy.call(operation)) == "primary"
+    assert len(attempts) == 1
+
+def test_extra_result_finishing_together_is_closed(monkeypatch):
+    monkeypatch.setattr(settings, "HEDGE_DEFAULT_DELAY", 0.01)
+    policy = UpstreamPolicy("test", timeout=5)
+    policy.hedge_budget = HedgeBudget(ratio=1.0)
+    results = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def operation():
+            result = Closable(f"attempt {len(results) + 1}")
+            results.append(result)
+            if len(results) == 2:
+                release.set()
+            await release.wait()
+            return result
+
+        return await policy.call(operation)
+
+    winner = asyncio.run(scenario())
+    assert len(results) == 2
+    assert not winner.closed
+    assert [result.closed for result in results if result is not winner] == [True]
+
+def test_client_errors_are_not_retried_or_counted():
+    policy = UpstreamPolicy("test", timeout=5, breaker=CircuitBreaker("test", failure_threshold=2, reset_timeout=30))
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        raise StatusError(400)
+
+    for _ in range(5):
+        with pytest.raises(StatusError):
+            asyncio.run(policy.call(operation))
+    assert len(attempts) == 5
+    assert policy.breaker.state == CircuitBreaker.CLOSED
+
+def test_server_errors_are_retried_and_open_the_circuit():
+    policy = UpstreamPolicy("test", timeout=5, breaker=CircuitBreaker("test", failure_threshold=3, reset_timeout=30))
+    attempts = []
+
+    async def operation():
+        attempts.append(1)
+        raise StatusError(503)
+
+    with pytest.raises(StatusError):
+        asyncio.run(policy.call(operation))
+    assert len(attempts) == settings.RETRY_ATTEMPTS + 1
+    assert policy.breaker.state == CircuitBreaker.OPEN
+
+@pytest.mark.parametrize("error, retryable", [
+    (StatusError(400), False),
+    (StatusError(401), False),
+    (StatusError(404), False),
+    (StatusError(408), True),
+    (StatusError(429), True),
+    (StatusError(500), True),
+    (StatusError(503), True),
+    (asyncio.TimeoutError(), True),
+    (ConnectionResetError(), True),
+])
+def test_is_retryable(error, retryable):
+    assert is_retryable(error) is retryable
@@ -0,0 +1,122 @@
+import asyncio
+
+import pytest
+
+from app.core.config import settings
+from app.core.runtime_config import TUNABLES, RuntimeConfig, Tunable
+
+@pytest.fixture(autouse=True)
+def restore_settings(monkeypatch):
+    # monkeypatch puts every tunable back after the test, whatever an update changed
+    for name in TUNABLES:
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+
+@pytest.fixture
+def config():
+    return RuntimeConfig(config_file="")
+
+@pytest.mark.parametrize("tunable, value, expected", [
+    (Tunable("X", int, 1, 10), 5, 5),
+    (Tunable("X", float, 0.0, 1.0), 1, 1.0),
+    (Tunable("X", bool), False, False),
+    (Tunable("X", str, choices=("a", "b")), "b", "b"),
+    (Tunable("X", str, choices=lambda: ("a", "b")), "a", "a"),
+])
+def test_tunable_accepts_and_converts_valid_values(tunable, value, expected):
+    result = tunable.validate(value)
+    assert result == expected
+    assert type(result) is type(expected)
+
+@pytest.mark.parametrize("tunable, value", [
+    (Tunable("X", int, 1, 10), 0),
+    (Tunable("X", int, 1, 10), 11),
+    (Tunable("X", int, 1, 10), 2.5),
+    (Tunable("X", int, 1, 10), True),
+    (Tunable("X", int, 1, 10), "5"),
+    (Tunable("X", float, 0.0, 1.0), True),
+    (Tunable("X", float, 0.0, 1.0), 1.5),
+    (Tunable("X", bool), 1),
+    (Tunable("X", str), ""),
+    (Tunable("X", str, choices=("a", "b")), "c"),
+])
+def test_tunable_rejects_invalid_values(tunable, value):
+    with pytest.raises(ValueError):
+        tunable.validate(value)
+
+def test_tunable_requiring_a_disabled_feature_is_rejected(monkeypatch):
+    monkeypatch.setattr(settings, "FRAME_CACHE_ENABLED", False)
+    with pytest.raises(ValueError, match="FRAME_CACHE_ENABLED"):
+        TUNABLES["FRAME_CACHE_SIZE"].validate(100)
+    assert not TUNABLES["FRAME_CACHE_SIZE"].to_dict()["active"]
+
+    monkeypatch.setattr(settings, "FRAME_CACHE_ENABLED", True)
+    assert TUNABLES["FRAME_CACHE_SIZE"].validate(100) == 100
+    assert TUNABLES["FRAME_CACHE_SIZE"].to_dict()["active"]
+
+def test_update_applies_changes_and_notifies_subscribers(config):
+    notified = []
+    config.subscribe(notified.append)
+    changed = config.update({"VISION_MAX_TOKENS": 120, "RATE_LIMIT_INTERVAL": settings.RATE_LIMIT_INTERVAL})
+
+    assert changed == {"VISION_MAX_TOKENS": 120}
+    assert settings.VISION_MAX_TOKENS == 120
+    assert notified == [changed]
+    assert config.version == 1
+    assert config.update({"VISION_MAX_TOKENS": 120}) == {}
+    assert config.version == 1
+
+@pytest.mark.parametrize("bad", [
+    {"VISION_MAX_TOKENS": 10_000},
+    {"NOT_A_SETTING": 1},
+    {"ADMIN_TOKEN": "x"},
+])
+def test_update_with_any_bad_key_applies_nothing(config, bad):
+    before = settings.RATE_LIMIT_INTERVAL
+    with pytest.raises(ValueError):
+        config.update({"RATE_LIMIT_INTERVAL": before + 1, **bad})
+    assert settings.RATE_LIMIT_INTERVAL == before
+    assert config.version == 0
+
+def test_update_collects_every_error(config):
+    with pytest.raises(ValueError) as error:
+        config.update({"VISION_MAX_TOKENS": 0, "VISION_MODEL": "unknown"})
+    assert "VISION_MAX_TOKENS" in str(error.value)
+    assert "VISION_MODEL" in str(error.value)
+
+@pytest.mark.parametrize("changes", [
+    {"AUDIO_STEP_UP_SEND_TIME": 0.5, "AUDIO_STEP_DOWN_SEND_TIME": 0.5},
+    {"AUDIO_STEP_UP_SEND_TIME": 1.0},
+    {"AUDIO_STEP_DOWN_SEND_TIME": 0.01, "VISION_MAX_TOKENS": 120},
+])
+def test_update_rejects_step_up_at_or_above_step_down(config, monkeypatch, changes):
+    monkeypatch.setattr(settings, "AUDIO_STEP_UP_SEND_TIME", 0.05)
+    monkeypatch.setattr(settings, "AUDIO_STEP_DOWN_SEND_TIME", 0.25)
+    tokens = settings.VISION_MAX_TOKENS
+    with pytest.raises(ValueError, match="AUDIO_STEP_UP_SEND_TIME must be below"):
+        config.update(changes)
+    assert (settings.AUDIO_STEP_UP_SEND_TIME, settings.AUDIO_STEP_DOWN_SEND_TIME) == (0.05, 0.25)
+    assert settings.VISION_MAX_TOKENS == tokens
+
+def test_update_may_move_both_thresholds_together(config, monkeypatch):
+    monkeypatch.setattr(settings, "AUDIO_STEP_UP_SEND_TIME", 0.05)
+    monkeypatch.setattr(settings, "AUDIO_STEP_DOWN_SEND_TIME", 0.25)
+    # Valid only as a pair: step-up alone would cross the current step-down
+    config.update({"AUDIO_STEP_UP_SEND_TIME": 1.0, "AUDIO_STEP_DOWN_SEND_TIME": 2.0})
+    assert (settings.AUDIO_STEP_UP_SEND_TIME, settings.AUDIO_STEP_DOWN_SEND_TIME) == (1.0, 2.0)
+
+def test_admin_token_check_handles_non_ascii_headers(monkeypatch):
+    pytest.importorskip("fastapi")
+    from fastapi import HTTPException
+    from app.api.routes.admin import AdminRouter
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    for token in (None, "wrong", "ädmin-secret"):
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(AdminRouter.verify_token(token))
+        assert error.value.status_code == 401
+    asyncio.run(AdminRouter.verify_token("admin-secret"))
+
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", None)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(AdminRouter.verify_token("admin-secret"))
+    assert error.value.status_code == 404
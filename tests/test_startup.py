@@ -0,0 +1,36 @@
+import json
+import os
+import subprocess
+import sys
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Importing the app must stay cheap so liveness answers right away; heavy
+# modules and clients are loaded by the startup warm-ups instead
+IMPORT_BUDGET_SECONDS = 3.0
+HEAVY_MODULES = ["cv2", "numpy", "PIL", "av", "openai", "elevenlabs"]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import app.main
+print(json.dumps({
+    "seconds": time.perf_counter() - started,
+    "loaded": [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+def test_app_import_is_fast_and_lazy():
+    # Deliberately no importorskip: without the app's dependencies this must fail, not skip
+    result = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        cwd=REPO_ROOT,
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.returncode == 0, result.stderr
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+
+    assert report["loaded"] == [], f"app.main imported heavy modules: {report['loaded']}"
+    assert report["seconds"] < IMPORT_BUDGET_SECONDS, f"app.main took {report['seconds']:.2f}s to import"
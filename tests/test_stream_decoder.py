@@ -0,0 +1,120 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import settings
+from app.services import stream_decoder
+from app.services.stream_decoder import (
+    ContainerStreamDecoder,
+    FrameSampler,
+    MJPEGStreamDecoder,
+    _ChunkPipe,
+    create_stream_decoder,
+)
+
+def jpeg(payload: bytes) -> bytes:
+    return b"\xff\xd8" + payload + b"\xff\xd9"
+
+def mjpeg_decoder(interval: float = 0.0):
+    frames = []
+    decoder = MJPEGStreamDecoder(frames.append)
+    decoder.sampler = FrameSampler(interval)
+    return decoder, frames
+
+def feed_in_chunks(decoder, data: bytes, size: int):
+    for offset in range(0, len(data), size):
+        assert decoder.feed(data[offset:offset + size])
+
+def test_sampler_keeps_one_frame_per_interval():
+    sampler = FrameSampler(1.0)
+    assert [sampler.should_sample(t) for t in (0.0, 0.4, 0.99, 1.0, 1.5, 2.2)] == [True, False, False, True, False, True]
+
+def test_sampler_follows_the_setting_without_a_fixed_interval(monkeypatch):
+    sampler = FrameSampler()
+    monkeypatch.setattr(settings, "VIDEO_STREAM_SAMPLE_INTERVAL", 2.0)
+    assert [sampler.should_sample(t) for t in (0.0, 1.0, 2.0)] == [True, False, True]
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 1000])
+def test_mjpeg_frames_are_split_across_any_chunking(chunk_size):
+    frames = [jpeg(b"first frame"), jpeg(b"\xff\x00second \xff"), jpeg(b"third")]
+    decoder, received = mjpeg_decoder()
+    feed_in_chunks(decoder, b"garbage" + frames[0] + frames[1] + b"\x00\xff" + frames[2], chunk_size)
+    assert received == frames
+
+def test_mjpeg_frames_between_samples_are_dropped(monkeypatch):
+    clock = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(stream_decoder, "time", SimpleNamespace(monotonic=lambda: clock.now))
+    decoder, received = mjpeg_decoder(interval=1.0)
+    for index in range(7):
+        clock.now = index * 0.4
+        decoder.feed(jpeg(b"frame %d" % index))
+    # Sampled at 0.0, 1.2 and 2.4 seconds
+    assert received == [jpeg(b"frame 0"), jpeg(b"frame 3"), jpeg(b"frame 6")]
+
+def test_oversized_mjpeg_frame_is_discarded(monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_STREAM_MAX_BUFFER", 64)
+    decoder, received = mjpeg_decoder()
+    feed_in_chunks(decoder, b"\xff\xd8" + b"x" * 200, 16)
+    decoder.feed(b"tail of the oversized frame\xff\xd9" + jpeg(b"next"))
+    assert received == [jpeg(b"next")]
+
+def test_mjpeg_split_frame_is_scanned_once():
+    scanned = []
+
+    class CountingBuffer(bytearray):
+        def find(self, sub, start=0, *args):
+            scanned.append(len(self) - start)
+            return super().find(sub, start, *args)
+
+    decoder, received = mjpeg_decoder()
+    decoder._buffer = CountingBuffer()
+    frame = jpeg(b"x" * 20000)
+    feed_in_chunks(decoder, frame, 100)
+    assert received == [frame]
+    assert sum(scanned) < 3 * len(frame)
+
+def test_chunk_pipe_refuses_chunks_beyond_its_limit():
+    pipe = _ChunkPipe(max_bytes=10)
+    assert pipe.put(b"12345")
+    assert pipe.put(b"6789")
+    assert not pipe.put(b"ab")
+
+    assert pipe.read(5) == b"12345"
+    assert pipe.read(2) == b"67"
+    # Chunks count against the limit until a read takes them
+    assert pipe.put(b"abcdefghij")
+    assert not pipe.put(b"k")
+    assert pipe.read(5) == b"89"
+    assert pipe.read(5) == b"abcde"
+
+def test_chunk_pipe_reads_block_until_data_or_eof():
+    pipe = _ChunkPipe(max_bytes=100)
+    results = []
+    reader = threading.Thread(target=lambda: results.extend([pipe.read(5), pipe.read(5), pipe.read(5)]))
+    reader.start()
+    pipe.put(b"hello")
+    pipe.put_eof()
+    reader.join(timeout=5)
+    assert results == [b"hello", b"", b""]
+
+def test_chunk_pipe_discard_drops_unread_chunks():
+    pipe = _ChunkPipe(max_bytes=10)
+    pipe.put(b"0123456789")
+    pipe.discard()
+    assert pipe.read(10) == b""
+    assert pipe.put(b"0123456789")
+
+def test_container_decoder_stops_when_decoding_falls_behind(monkeypatch):
+    monkeypatch.setattr(settings, "VIDEO_STREAM_MAX_BUFFER", 100)
+    # Not started, so nothing drains the pipe
+    decoder = create_stream_decoder("webm", lambda frame: None)
+    assert isinstance(decoder, ContainerStreamDecoder)
+    assert decoder.feed(b"x" * 60)
+    assert not decoder.feed(b"x" * 60)
+    assert decoder.error == "Decoder fell behind the stream"
+    assert not decoder.feed(b"x")
+
+def test_unknown_stream_format_is_rejected():
+    with pytest.raises(ValueError):
+        create_stream_decoder("avi", lambda frame: None)